@@ -0,0 +1,37 @@
+"Throughput of games.poker.batch.evaluate_batch against the per hand evaluator"
+import argparse
+import time
+import numpy as np
+from games.poker.batch import evaluate_batch
+from games.poker.evaluator import evaluate_indices
+
+def random_hands(n: int, k: int, seed: int) -> np.ndarray:
+    "n hands of k distinct card indices"
+    rng = np.random.default_rng(seed)
+    return np.argsort(rng.random((n, 52)), axis=1)[:, :k].astype(np.int8)
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--hands", type=int, default=1_000_000)
+    parser.add_argument("-k", "--cards", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scalar", type=int, default=100_000, help="hands timed with the per hand evaluator")
+    args = parser.parse_args(argv)
+
+    hands = random_hands(args.hands, args.cards, args.seed)
+    start = time.perf_counter()
+    strengths, _ = evaluate_batch(hands)
+    batch_time = time.perf_counter() - start
+
+    sample = hands[:args.scalar].tolist()
+    start = time.perf_counter()
+    scalar = [evaluate_indices(hand) for hand in sample]
+    scalar_time = time.perf_counter() - start
+    if scalar != strengths[:args.scalar].tolist():
+        raise SystemExit("batch and per hand evaluators disagree")
+
+    print(f"batch : {args.hands:>10} hands in {batch_time:.3f}s -> {args.hands/batch_time:,.0f} hands/s")
+    print(f"scalar: {len(sample):>10} hands in {scalar_time:.3f}s -> {len(sample)/scalar_time:,.0f} hands/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"Benchmarks of the core and poker hot paths with fixed seeds, JSON output and baseline regression checks"
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from itertools import cycle
+from typing import Callable, NamedTuple, Optional
+from core import Card, CardPile, Deck52
+from games.poker import Chips, HandRankfunc, Player, RandomAgent, Round, Simulator, Table
+from games.poker.evaluator import evaluate_indices
+
+# Every benchmark is a setup(seed) returning the operation to time. Inputs come from fixed seeds and a
+# fixed corpus size, so two runs of the same tree time exactly the same work.
+#
+#   python -m benchmarks.suite --json results.json                      run and store
+#   python -m benchmarks.suite --baseline results.json --threshold 0.1  fail on a >10% ops/s drop
+
+CORPUS = 1024
+
+class Benchmark(NamedTuple):
+    name: str
+    setup: Callable[[int], Callable[[], object]]
+    doc: str
+
+BENCHMARKS: dict[str, Benchmark] = {}
+
+def benchmark(name: str):
+    def register(setup: Callable[[int], Callable[[], object]]):
+        BENCHMARKS[name] = Benchmark(name, setup, setup.__doc__ or "")
+        return setup
+    return register
+
+def _table(players: int) -> tuple[Table, dict]:
+    seats = [Player(f"P{i}", Chips(10**9)) for i in range(players)]
+    for player in seats:
+        player.auto_buyin_atmax = True
+    return Table(seats, blind_amount=Chips(10)), {player.id: RandomAgent(random.Random(i)) for i, player in enumerate(seats)}
+
+def _hands(seed: int, cards: int) -> list[list[int]]:
+    rng = random.Random(seed)
+    return [rng.sample(range(52), cards) for _ in range(CORPUS)]
+
+def _river_rounds(seed: int, players: int) -> list[Round]:
+    rng = random.Random(seed)
+    rounds = []
+    for _ in range(CORPUS // 16):
+        # a table per round, players keep only the hand of their latest round
+        table, agents = _table(players)
+        round = Round(table, agents, random.Random(rng.getrandbits(64)))
+        round.open_flop()
+        round.open_turn()
+        round.open_river()
+        rounds.append(round)
+    return rounds
+
+@benchmark("deck52")
+def _deck52(seed: int):
+    "Deck52() construction"
+    return Deck52
+
+@benchmark("shuffle")
+def _shuffle(seed: int):
+    "CardPile.shuffle of a full deck with a seeded random.Random"
+    deck, rng = Deck52(), random.Random(seed)
+    return lambda: deck.shuffle(rng)
+
+@benchmark("deal")
+def _deal(seed: int):
+    "lazy shuffle and dealCard of a 10 handed hold'em deal (20 hole cards, 3 burns, 5 board cards)"
+    rng = random.Random(seed)
+    def op():
+        deck, hands, burns, board = Deck52(), [CardPile() for _ in range(10)], CardPile(), CardPile()
+        deck.shuffle(rng, lazy=True)
+        for _ in range(2):
+            for hand in hands:
+                deck.dealCard(hand)
+        for k in (3, 1, 1):
+            deck.dealCard(burns)
+            for _ in range(k):
+                deck.dealCard(board, face_up=True)
+    return op
+
+@benchmark("bulk_deal")
+def _bulk_deal(seed: int):
+    "the same deal with deal_round_robin for the hole cards and deal_many for burns and the board"
+    rng = random.Random(seed)
+    def op():
+        deck, hands, burns, board = Deck52(), [CardPile() for _ in range(10)], CardPile(), CardPile()
+        deck.shuffle(rng, lazy=True)
+        deck.deal_round_robin(2, hands)
+        for k in (3, 1, 1):
+            deck.deal_many(1, burns)
+            deck.deal_many(k, board, face_up=True)
+    return op
+
+@benchmark("round_init")
+def _round_init(seed: int):
+    "Round.__init__ on a 10 handed table, deals the hole cards"
+    table, agents = _table(10)
+    rng = random.Random(seed)
+    return lambda: Round(table, agents, rng)
+
+@benchmark("evaluate_indices")
+def _evaluate_indices(seed: int):
+    "table evaluator on 7 card indices"
+    hands = cycle(_hands(seed, 7))
+    return lambda: evaluate_indices(next(hands))
+
+@benchmark("rank_of_hand")
+def _rank_of_hand(seed: int):
+    "HandRankfunc.rank_of_hand on 7 card CardPiles (strength and best five cards)"
+    piles = cycle([CardPile([Card.from_index(c) for c in hand]) for hand in _hands(seed, 7)])
+    return lambda: HandRankfunc.rank_of_hand(next(piles))
+
+@benchmark("rank_hands")
+def _rank_hands(seed: int):
+    "HandRankfunc.rank_hands of a 6 handed round on the river"
+    rounds = cycle(_river_rounds(seed, 6))
+    return lambda: HandRankfunc.rank_hands(next(rounds))
+
+@benchmark("simulator_hand")
+def _simulator_hand(seed: int):
+    "Simulator.play_hand, 6 random agents"
+    table, agents = _table(6)
+    return Simulator(table, agents, seed).play_hand
+
+def measure(op: Callable[[], object], iterations: int, memory_iterations: int) -> dict[str, float]:
+    "ops/s over all calls, p50/p99 latency of single calls in microseconds and the tracemalloc peak in KiB"
+    clock = time.perf_counter_ns
+    for _ in range(min(100, iterations)):
+        op()
+    latencies = [0]*iterations
+    start = clock()
+    for i in range(iterations):
+        t = clock()
+        op()
+        latencies[i] = clock() - t
+    total = clock() - start
+    latencies.sort()
+    tracemalloc.start()
+    for _ in range(memory_iterations):
+        op()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "iterations": iterations,
+        "ops_per_sec": iterations / (total / 1e9),
+        "p50_us": latencies[iterations // 2] / 1e3,
+        "p99_us": latencies[min(iterations - 1, iterations * 99 // 100)] / 1e3,
+        "peak_kib": peak / 1024,
+    }
+
+def run(names: Optional[list[str]] = None, iterations: int = 5000, seed: int = 0,
+        memory_iterations: int = 100) -> dict[str, dict[str, float]]:
+    unknown = set(names or []) - set(BENCHMARKS)
+    if unknown:
+        raise ValueError(f"Unknown benchmarks {sorted(unknown)}, choose from {list(BENCHMARKS)}.")
+    return {name: measure(BENCHMARKS[name].setup(seed), iterations, memory_iterations)
+            for name in (names or BENCHMARKS)}
+
+def compare(results: dict[str, dict[str, float]], baseline: dict[str, dict[str, float]],
+            threshold: float) -> list[str]:
+    "one line per benchmark whose ops/s fell more than threshold (a fraction) below the baseline"
+    resp = []
+    for name, result in results.items():
+        if name in baseline:
+            before, now = baseline[name]["ops_per_sec"], result["ops_per_sec"]
+            if now < before * (1 - threshold):
+                resp.append(f"{name}: {now:,.0f} ops/s is {1 - now/before:.1%} below the baseline {before:,.0f} ops/s")
+    return resp
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("names", nargs="*", help=f"benchmarks to run, all by default: {', '.join(BENCHMARKS)}")
+    parser.add_argument("-n", "--iterations", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="results file of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed ops/s drop against the baseline")
+    args = parser.parse_args(argv)
+
+    results = run(args.names, args.iterations, args.seed)
+    for name, result in results.items():
+        print(f"{name:<18} {result['ops_per_sec']:>12,.0f} ops/s  p50 {result['p50_us']:>9.2f}us  "
+              f"p99 {result['p99_us']:>9.2f}us  peak {result['peak_kib']:>9.1f}KiB")
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({"python": platform.python_version(), "seed": args.seed, "results": results}, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file)["results"], args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,8 @@
 from .suit import Suit
 from .rank import Rank
 from .card import Card
-from .card_pile import CardPile
+from .card_pile import CardPile, PileView
+from .card_mask import CardMask
 from .deck52 import Deck52
 
-__all__ = ["Card", "Rank", "Suit", "CardPile", "Deck52"]
\ No newline at end of file
+__all__ = ["Card", "Rank", "Suit", "CardPile", "PileView", "CardMask", "Deck52"]
\ No newline at end of file
@@ -1,30 +1,67 @@
-from .suit import Suit
-from .rank import Rank
+from .suit import Suit, STANDARD_SUITS
+from .rank import Rank, STANDARD_RANKS
 
 class Card():
-    def __init__(self, suit: Suit, rank: Rank, face_up: bool = False):
-        self.suit: Suit = suit
-        self.rank: Rank = rank
-        self.face_up: bool = face_up
-    
+    "Immutable and interned: there is exactly one Card object per (suit, rank), Card(suit, rank) returns it"
+    "Whether a card is face up is kept by the CardPile holding it, not by the card"
+    __slots__ = ("suit", "rank", "index")
+    _INTERNED: dict[tuple[Suit, Rank], Card] = {}
+    _BY_INDEX: list[Card] = []
+
+    suit: Suit
+    rank: Rank
+    index: int # Canonical 0..51 encoding of the card: suit_index*13 + (rank - 2), suits in STANDARD_SUITS order
+
+    def __new__(cls, suit: Suit, rank: Rank) -> Card:
+        try:
+            return cls._INTERNED[(suit, rank)]
+        except KeyError:
+            raise ValueError(f"Not a standard card, {suit=}, {rank=}.") from None
+
+    @classmethod
+    def _intern(cls, suit: Suit, rank: Rank) -> Card:
+        card = object.__new__(cls)
+        object.__setattr__(card, "suit", suit)
+        object.__setattr__(card, "rank", rank)
+        object.__setattr__(card, "index", STANDARD_SUITS.index(suit)*13 + rank - 2)
+        cls._INTERNED[(suit, rank)] = card
+        return card
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{self.__class__.__name__} is immutable.")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{self.__class__.__name__} is immutable.")
+
     def __str__(self) -> str:
-        if self.face_up != False:
-            return f'{self.suit}{self.rank}'
-        else:
-            return f'##'
-        
+        return f'{self.suit}{self.rank}'
+
     def __repr__(self) -> str:
         return (f'{self.__class__.__name__}(suit={self.suit.__class__.__name__}.{self.suit.name}, '
-                f'rank={self.rank.__class__.__name__}.{self.rank.name}, face_up={self.face_up})')
-    
-    def flip(self):
-        self.face_up = not self.face_up
-        return
-    
+                f'rank={self.rank.__class__.__name__}.{self.rank.name})')
+
+    @classmethod
+    def from_index(cls, index: int) -> Card:
+        if not 0 <= index < 52:
+            raise ValueError(f"Card index must be in 0..51, not {index=}.")
+        return cls._BY_INDEX[index]
+
+    def __reduce__(self):
+        return (Card.from_index, (self.index,))
+
+    def __copy__(self) -> Card:
+        return self
+
+    def __deepcopy__(self, memo) -> Card:
+        return self
+
     def __hash__(self):
-        return hash((self.suit, self.rank))
-    
+        return self.index
+
     def __eq__(self, other) -> bool:
         if not isinstance(other, Card):
             return NotImplemented
-        return self.suit == other.suit and self.rank == other.rank
\ No newline at end of file
+        return self is other
+
+Card._BY_INDEX.extend(sorted((Card._intern(suit, rank) for suit in STANDARD_SUITS for rank in STANDARD_RANKS),
+                             key=lambda card: card.index))
@@ -0,0 +1,134 @@
+from typing import Iterable, Iterator
+from .card import Card
+from .card_pile import CardPile
+from .suit import Suit, STANDARD_SUITS
+
+RANK_BITS = 13
+SUIT_RANK_MASK = (1 << RANK_BITS) - 1
+FULL_BITS = (1 << 52) - 1
+
+class CardMask():
+    "A set of cards packed in an int, bit Card.index is set for every card in the set"
+    "Per suit the 13 bits are a rank mask: bit (rank - 2) of suit_ranks(suit)"
+    "Mutable like a set, so not hashable: key dicts and sets on int(mask)"
+    __slots__ = ("bits",)
+
+    def __init__(self, bits: int = 0) -> None:
+        if not 0 <= bits <= FULL_BITS:
+            raise ValueError(f"CardMask bits must fit in 52 bits, {bits=}.")
+        self.bits: int = bits
+
+    @classmethod
+    def from_indices(cls, indices: Iterable[int]) -> CardMask:
+        bits = 0
+        for index in indices:
+            bits |= 1 << index
+        return cls(bits)
+
+    @classmethod
+    def from_cards(cls, cards: Iterable[Card]) -> CardMask:
+        return cls.from_indices(card.index for card in cards)
+    from_pile = from_cards
+
+    @classmethod
+    def full(cls) -> CardMask:
+        return cls(FULL_BITS)
+
+    def indices(self) -> list[int]:
+        "indices of the cards in ascending order"
+        resp = []
+        bits = self.bits
+        while bits:
+            low = bits & -bits
+            resp.append(low.bit_length() - 1)
+            bits ^= low
+        return resp
+
+    def to_cards(self) -> list[Card]:
+        return [Card.from_index(index) for index in self.indices()]
+
+    def to_pile(self, comment: str = "", face_up: bool = False) -> CardPile:
+        return CardPile(self.to_cards(), comment, face_up)
+
+    def suit_ranks(self, suit: Suit|int) -> int:
+        "13-bit rank mask of the cards of one suit"
+        if isinstance(suit, Suit):
+            suit = STANDARD_SUITS.index(suit)
+        return (self.bits >> (RANK_BITS*suit)) & SUIT_RANK_MASK
+
+    def rank_mask(self) -> int:
+        "13-bit mask of the ranks present in any suit"
+        bits = self.bits
+        return (bits | bits >> 13 | bits >> 26 | bits >> 39) & SUIT_RANK_MASK
+
+    def add(self, card: Card|int) -> None:
+        self.bits |= 1 << (card if isinstance(card, int) else card.index)
+
+    def discard(self, card: Card|int) -> None:
+        self.bits &= ~(1 << (card if isinstance(card, int) else card.index))
+
+    def __contains__(self, card: Card|int) -> bool:
+        return bool(self.bits >> (card if isinstance(card, int) else card.index) & 1)
+
+    def __len__(self) -> int:
+        return self.bits.bit_count()
+
+    def __bool__(self) -> bool:
+        return self.bits != 0
+
+    def __iter__(self) -> Iterator[Card]:
+        return iter(self.to_cards())
+
+    def __int__(self) -> int:
+        return self.bits
+
+    def __or__(self, other: CardMask) -> CardMask:
+        if not isinstance(other, CardMask): return NotImplemented
+        return CardMask(self.bits | other.bits)
+
+    def __and__(self, other: CardMask) -> CardMask:
+        if not isinstance(other, CardMask): return NotImplemented
+        return CardMask(self.bits & other.bits)
+
+    def __xor__(self, other: CardMask) -> CardMask:
+        if not isinstance(other, CardMask): return NotImplemented
+        return CardMask(self.bits ^ other.bits)
+
+    def __sub__(self, other: CardMask) -> CardMask:
+        if not isinstance(other, CardMask): return NotImplemented
+        return CardMask(self.bits & ~other.bits)
+
+    def __invert__(self) -> CardMask:
+        return CardMask(FULL_BITS & ~self.bits)
+
+    def __ior__(self, other: CardMask) -> CardMask:
+        if not isinstance(other, CardMask): return NotImplemented
+        self.bits |= other.bits
+        return self
+
+    def __iand__(self, other: CardMask) -> CardMask:
+        if not isinstance(other, CardMask): return NotImplemented
+        self.bits &= other.bits
+        return self
+
+    def __isub__(self, other: CardMask) -> CardMask:
+        if not isinstance(other, CardMask): return NotImplemented
+        self.bits &= ~other.bits
+        return self
+
+    def isdisjoint(self, other: CardMask) -> bool:
+        return not self.bits & other.bits
+
+    def __le__(self, other: CardMask) -> bool:
+        if not isinstance(other, CardMask): return NotImplemented
+        return self.bits & ~other.bits == 0
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, CardMask): return NotImplemented
+        return self.bits == other.bits
+
+    def __str__(self) -> str:
+        return " ".join(str(card) for card in self.to_cards())
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.bits:#x})"
@@ -1,111 +1,334 @@
 from .card import Card, Rank, Suit
 from .rank import STANDARD_RANKS
 from .suit import STANDARD_SUITS
+from .rng import ShuffleRNG, PermutationBatch
+import copy
 import random
+from itertools import chain
+from typing import Iterator, Optional
+
+def _fork(rng: ShuffleRNG) -> ShuffleRNG:
+    "an independent generator in the same state"
+    if rng is random:
+        fork = random.Random()
+        fork.setstate(random.getstate())
+        return fork
+    return copy.copy(rng)
+
+_RANKS: list[Rank] = sorted(STANDARD_RANKS) # by rank - 2
 
 # _PossibleCards: list[Card] = list(Card(*args) for args in itertools.product(Suit, Rank))
 class CardPile():
     "A stack of Cards in the event"
     "Last element of cards is the topmost card of the deck"
+    "Face up cards are tracked by the pile as a bit mask over Card.index, cards themselves are immutable"
+    "rng is the pile's own random generator for shuffle, so piles of concurrent tables never share state"
+    "indexed piles keep per card, rank and suit counts up to date, see build_index()"
     def __init__(self, /, 
                  cards: list[Card] = None, #type: ignore
-                 comment: str=""
+                 comment: str="",
+                 face_up: bool = False,
+                 rng: Optional[ShuffleRNG] = None,
+                 indexed: bool = False
                  ) -> None:
         # self.allowDuplicate: bool = allowDuplicate
         self._cards: list[Card] = cards if cards else list()
         self.comment: str = comment
+        self._face_up: int = self._mask_of(self._cards) if face_up else 0
+        self.rng: Optional[ShuffleRNG] = rng
+        # lazy shuffle: _cards[:_unshuffled] is not randomized yet, dealCard draws from it one card at a time
+        self._unshuffled: int = 0
+        self._lazy_rng: Optional[ShuffleRNG] = None
+        # counts by Card.index, rank - 2 and suit index, None while the pile is not indexed
+        self._by_card: Optional[list[int]] = None
+        self._by_rank: list[int] = []
+        self._by_suit: list[int] = []
+        if indexed:
+            self.build_index()
+
+    @staticmethod
+    def _mask_of(cards: list[Card]) -> int:
+        mask = 0
+        for card in cards:
+            mask |= 1 << card.index
+        return mask
+
+    def is_face_up(self, card: Card) -> bool:
+        return bool(self._face_up >> card.index & 1)
+
+    def set_face_up(self, card: Card, face_up: bool = True) -> None:
+        if face_up:
+            self._face_up |= 1 << card.index
+        else:
+            self._face_up &= ~(1 << card.index)
+
+    def build_index(self) -> None:
+        "starts keeping the counts, O(len) once, then O(1) per added or removed card"
+        self._by_card, self._by_rank, self._by_suit = [0]*52, [0]*13, [0]*4
+        for card in self._cards:
+            self._count(card, 1)
+
+    @property
+    def indexed(self) -> bool:
+        return self._by_card is not None
+
+    def _count(self, card: Card, delta: int) -> None:
+        index = card.index
+        self._by_card[index] += delta # type: ignore
+        self._by_rank[index % 13] += delta
+        self._by_suit[index // 13] += delta
+
+    def seed(self, seed: Optional[int] = None) -> None:
+        "gives the pile its own random.Random"
+        self.rng = random.Random(seed)
+
+    def shuffle(self, rng: Optional[ShuffleRNG] = None, lazy: bool = False) -> None:
+        """shuffles with rng, else the pile's rng, else the global random module state.
+        lazy only picks the top card when it is dealt (Fisher-Yates one step per dealCard) and finishes
+        the shuffle the first time anything else looks at the order. With a random.Random it deals exactly
+        the cards an eager shuffle with the same state would."""
+        rng = rng if rng else (self.rng if self.rng else random) # type: ignore
+        self._unshuffled = 0
+        # a PermutationBatch already paid for the whole permutation
+        if lazy and not isinstance(rng, PermutationBatch):
+            self._unshuffled, self._lazy_rng = len(self._cards), rng
+        else:
+            rng.shuffle(self._cards)
 
-    def shuffle(self) -> None:
-        random.shuffle(self._cards)
+    def _settle(self) -> None:
+        "finishes a lazy shuffle"
+        if self._unshuffled:
+            cards, randrange = self._cards, self._lazy_rng.randrange # type: ignore
+            for i in reversed(range(1, self._unshuffled)):
+                j = randrange(i + 1)
+                cards[i], cards[j] = cards[j], cards[i]
+            self._unshuffled, self._lazy_rng = 0, None
 
-    def addCard(self, card: Card) -> None:
+    def copy(self) -> CardPile:
+        """same cards, face up cards and rng. A lazy shuffle is finished on the copy with a copy of its rng,
+        so the copy holds the cards in exactly the order the original goes on to deal them"""
+        resp = CardPile(self._cards.copy(), self.comment, rng=self.rng, indexed=self.indexed)
+        resp._face_up = self._face_up
+        if self._unshuffled:
+            resp._unshuffled, resp._lazy_rng = self._unshuffled, _fork(self._lazy_rng) # type: ignore
+            resp._settle()
+        return resp
+
+    def addCard(self, card: Card, face_up: bool = False) -> None:
+        if self._unshuffled: self._settle()
         self._cards.append(card)
+        self.set_face_up(card, face_up)
+        if self._by_card is not None: self._count(card, 1)
 
-    def insertCard(self, index:int, card: Card) -> None:
+    def insertCard(self, index:int, card: Card, face_up: bool = False) -> None:
+        if self._unshuffled: self._settle()
         self._cards.insert(index, card)
+        self.set_face_up(card, face_up)
+        if self._by_card is not None: self._count(card, 1)
 
     def addCards(self, cards: list[Card]) -> None:
+        if self._unshuffled: self._settle()
         self._cards += cards
+        if self._by_card is not None:
+            for card in cards:
+                self._count(card, 1)
     
-    def dealCard(self, deck: CardPile, face_up: bool = False) -> CardPile:
+    def dealCard(self, deck: CardPile, face_up: bool|None = False) -> CardPile:
+        "moves the top card to deck, face_up=None keeps the side the card is showing"
+        if (k := self._unshuffled):
+            # one Fisher-Yates step, the unshuffled part always ends at the top here
+            cards = self._cards
+            if k > 1:
+                j = self._lazy_rng.randrange(k) # type: ignore
+                cards[k-1], cards[j] = cards[j], cards[k-1]
+            self._unshuffled = k - 1
         card: Card = self._cards.pop()
-        if face_up is not None:
-            card.face_up = face_up
-        deck.addCard(card)
+        if self._by_card is not None: self._count(card, -1)
+        if face_up is None:
+            face_up = self.is_face_up(card)
+        self._face_up &= ~(1 << card.index)
+        deck.addCard(card, face_up)
+        return self
+
+    def _draw(self, k: int) -> tuple[list[Card], int]:
+        "removes the top k cards, returns them in the order dealCard would deal them and the mask of those face up"
+        cards = self._cards
+        n = len(cards) - k
+        if not 0 <= k <= len(cards):
+            raise ValueError(f"Cannot deal {k} cards from a pile of {len(cards)}.")
+        if (u := self._unshuffled):
+            # the same Fisher-Yates steps k dealCard calls would take
+            randrange = self._lazy_rng.randrange # type: ignore
+            for i in range(u - 1, max(n, 1) - 1, -1):
+                j = randrange(i + 1)
+                cards[i], cards[j] = cards[j], cards[i]
+            self._unshuffled = max(n, 0)
+        drawn = cards[n:]
+        drawn.reverse()
+        del cards[n:]
+        shown = 0
+        # masks only matter when the pile has face up cards, a deck usually has none
+        if self._face_up:
+            mask = self._mask_of(drawn)
+            shown, self._face_up = self._face_up & mask, self._face_up & ~mask
+        if self._by_card is not None:
+            for card in drawn:
+                self._count(card, -1)
+        return drawn, shown
+
+    def _receive(self, cards: list[Card], face_up: bool|None, shown: int) -> None:
+        "puts dealt cards on top, face_up like dealCard with shown the mask of the dealt cards showing"
+        if self._unshuffled: self._settle()
+        self._cards += cards
+        if face_up:
+            self._face_up |= self._mask_of(cards)
+        elif self._face_up or (face_up is None and shown):
+            mask = self._mask_of(cards)
+            self._face_up = self._face_up & ~mask | (shown & mask if face_up is None else 0)
+        if self._by_card is not None:
+            for card in cards:
+                self._count(card, 1)
+
+    def deal_many(self, k: int, deck: CardPile, face_up: bool|None = False) -> CardPile:
+        "k dealCard calls in one step: the same cards in the same order, one slice moved"
+        cards, shown = self._draw(k)
+        deck._receive(cards, face_up, shown)
+        return self
+
+    def deal_round_robin(self, n: int, decks: list[CardPile], face_up: bool|None = False) -> CardPile:
+        """n cards to each of decks, one at a time in turn like n rounds of dealCard over them,
+        moved as one slice per deck"""
+        m = len(decks)
+        cards, shown = self._draw(n*m)
+        for i, deck in enumerate(decks):
+            deck._receive(cards[i::m], face_up, shown)
         return self
+
+    def view(self, *piles: CardPile) -> PileView:
+        "read-only view of this pile followed by piles, nothing is copied"
+        return PileView(self, *piles)
     
     def __str__(self) -> str:
         # resp = f"CardPile({self.comment!r}) From Bottom to Top => "
+        if self._unshuffled: self._settle()
         resp=""
         # for card in self._cards:
         #     resp += card.__repr__() + '\n'
-        return resp + " ".join(str(card) for card in self._cards)
+        return resp + " ".join(str(card) if self._face_up >> card.index & 1 else '##' for card in self._cards)
 
     def reverse(self) -> None:
+        if self._unshuffled: self._settle()
         self._cards.reverse()
 
     def flipCards_inplace(self) -> None:
-        for card in self._cards:
-            card.flip()
+        self._face_up ^= self._mask_of(self._cards)
 
     def flip(self) -> None:
+        if self._unshuffled: self._settle()
         self._cards.reverse()
         self.flipCards_inplace()
 
     def flip_open(self) -> None:
-        for card in self._cards:
-            card.face_up = True
+        self._face_up = self._mask_of(self._cards)
     
     def __iter__(self):
+        if self._unshuffled: self._settle()
         return iter(self._cards)
 
     def __getitem__(self, key):
+        if self._unshuffled: self._settle()
         return self._cards[key]
     
     def __len__(self) -> int:
         return len(self._cards)
     
     def __reversed__(self):
+        if self._unshuffled: self._settle()
         return reversed(self._cards)
     
     def __setitem__(self, key, card):
+        if self._unshuffled: self._settle()
+        if isinstance(key, slice):
+            card = list(card)
+        removed = self._cards[key]
         self._cards[key] = card
+        self._face_up &= ~self._mask_of(removed if isinstance(key, slice) else [removed])
+        if self._by_card is not None:
+            for old in (removed if isinstance(key, slice) else [removed]):
+                self._count(old, -1)
+            for new in (card if isinstance(key, slice) else [card]):
+                self._count(new, 1)
 
     def __delitem__(self, key: int|slice):
+        if self._unshuffled: self._settle()
+        removed = self._cards[key]
         del self._cards[key]
+        self._face_up &= ~self._mask_of(removed if isinstance(key, slice) else [removed])
+        if self._by_card is not None:
+            for old in (removed if isinstance(key, slice) else [removed]):
+                self._count(old, -1)
 
     def __add__(self, other: CardPile|Card|list[Card]) -> CardPile:
+        if self._unshuffled: self._settle()
         if isinstance(other, CardPile):
-            return CardPile(
+            other._settle()
+            resp = CardPile(
                 cards=self._cards + other._cards,
-                comment=self.comment + other.comment
+                comment=self.comment + other.comment,
+                indexed=self.indexed
             )
+            resp._face_up = self._face_up | other._face_up
         elif isinstance(other, list):
-            return CardPile(self._cards + other, self.comment)
+            resp = CardPile(self._cards + other, self.comment, indexed=self.indexed)
+            resp._face_up = self._face_up
         elif isinstance(other, Card):
-            return CardPile(self._cards + [other], self.comment)
+            resp = CardPile(self._cards + [other], self.comment, indexed=self.indexed)
+            resp._face_up = self._face_up
         else:
             return NotImplemented
+        return resp
         
     def __iadd__(self, other: CardPile|Card|list[Card]) -> CardPile:
+        if self._unshuffled: self._settle()
         if isinstance(other, CardPile):
-            self._cards += other._cards
+            other._settle()
+            added = other._cards
             self.comment += other.comment
+            self._face_up |= other._face_up
         elif isinstance(other, list):
-            self._cards += other
+            added = other
         elif isinstance(other, Card):
-            self._cards.append(other)
+            added = [other]
         else:
             return NotImplemented
+        self._cards += added
+        if self._by_card is not None:
+            for card in added:
+                self._count(card, 1)
         return self
     
     def __repr__(self):
+        if self._unshuffled: self._settle()
         return f'{self.__class__.__name__}(cards={self._cards!r},comment={self.comment})'
     
     def __contains__(self, item: Card)->bool:
+        if self._by_card is not None:
+            return self._by_card[item.index] > 0
         return item in self._cards
+
+    def rank_count(self, rank: Rank) -> int:
+        if self._by_card is not None:
+            return self._by_rank[rank - 2]
+        return sum(1 for card in self._cards if card.rank == rank)
+
+    def suit_count(self, suit: Suit) -> int:
+        if self._by_card is not None:
+            return self._by_suit[STANDARD_SUITS.index(suit)]
+        return sum(1 for card in self._cards if card.suit == suit)
     
     def rank_counts(self) -> dict[Rank, int]:
+        if self._by_card is not None:
+            return {_RANKS[r]: n for r, n in enumerate(self._by_rank) if n}
         rank_counts: dict[Rank, int] = dict()
         # {rank:0 for rank in STANDARD_RANKS}
         for card in self._cards:
@@ -116,6 +339,8 @@ class CardPile():
         return rank_counts
     
     def suit_counts(self) -> dict[Suit, int]:
+        if self._by_card is not None:
+            return {STANDARD_SUITS[s]: n for s, n in enumerate(self._by_suit) if n}
         suit_counts: dict[Suit, int] = dict()
         # {suit:0 for suit in STANDARD_SUITS}
         for card in self._cards:
@@ -126,9 +351,15 @@ class CardPile():
         return suit_counts
     
     def sort(self, *, key = None, reverse:bool = False):
+        self._unshuffled, self._lazy_rng = 0, None
         self._cards.sort(key=key, reverse=reverse)
     
     def get_cards_with_rank(self, rank: Rank) -> list[Card]:
+        "in pile order, in suit order when indexed"
+        if self._by_card is not None:
+            by_card, cards = self._by_card, Card._BY_INDEX
+            return [cards[i] for i in range(rank - 2, 52, 13) for _ in range(by_card[i])]
+        if self._unshuffled: self._settle()
         resp = []
         for card in self._cards:
             if card.rank == rank:
@@ -136,6 +367,11 @@ class CardPile():
         return resp
     
     def get_cards_with_suit(self, suit: Suit) -> list[Card]:
+        "in pile order, in rank order when indexed"
+        if self._by_card is not None:
+            by_card, cards, start = self._by_card, Card._BY_INDEX, 13*STANDARD_SUITS.index(suit)
+            return [cards[i] for i in range(start, start + 13) for _ in range(by_card[i])]
+        if self._unshuffled: self._settle()
         resp = []
         for card in self._cards:
             if card.suit == suit:
@@ -143,14 +379,73 @@ class CardPile():
         return resp
     
     def seperate_cards_by_rank(self, rank:Rank) -> list[Card]:
-        resp = self.get_cards_with_rank(rank)
-        for card in resp:
-            self._cards.remove(card)
+        "removes and returns the cards of a rank, in one pass over the pile"
+        if self._unshuffled: self._settle()
+        resp = [card for card in self._cards if card.rank == rank]
+        if resp:
+            self._cards[:] = [card for card in self._cards if card.rank != rank]
+            self._face_up &= ~self._mask_of(resp)
+            if self._by_card is not None:
+                for card in resp:
+                    self._count(card, -1)
         return resp
-    
-        
 
+class PileView():
+    """Read-only view of piles one after the other, like their sum without copying any cards.
+    It follows later changes of the piles, take a CardPile copy to keep the cards as they are now."""
+    __slots__ = ("piles",)
 
-    
+    def __init__(self, *piles: CardPile) -> None:
+        self.piles: tuple[CardPile, ...] = piles
 
+    def __iter__(self) -> Iterator[Card]:
+        return chain.from_iterable(self.piles)
 
+    def __len__(self) -> int:
+        return sum(len(pile) for pile in self.piles)
+
+    def __getitem__(self, key: int|slice):
+        if isinstance(key, slice):
+            return list(self)[key]
+        if key < 0:
+            key += len(self)
+        if key >= 0:
+            for pile in self.piles:
+                if key < len(pile):
+                    return pile[key]
+                key -= len(pile)
+        raise IndexError("PileView index out of range")
+
+    def __reversed__(self) -> Iterator[Card]:
+        return chain.from_iterable(reversed(pile) for pile in reversed(self.piles))
+
+    def __contains__(self, item: Card) -> bool:
+        return any(item in pile for pile in self.piles)
+
+    def is_face_up(self, card: Card) -> bool:
+        return any(pile.is_face_up(card) for pile in self.piles if card in pile)
+
+    def rank_counts(self) -> dict[Rank, int]:
+        rank_counts: dict[Rank, int] = dict()
+        for card in self:
+            rank_counts[card.rank] = rank_counts.get(card.rank, 0) + 1
+        return rank_counts
+
+    def suit_counts(self) -> dict[Suit, int]:
+        suit_counts: dict[Suit, int] = dict()
+        for card in self:
+            suit_counts[card.suit] = suit_counts.get(card.suit, 0) + 1
+        return suit_counts
+
+    def to_pile(self, comment: str = "") -> CardPile:
+        "a CardPile holding a copy of the cards, like the sum of the piles"
+        resp = CardPile(list(self), comment)
+        for pile in self.piles:
+            resp._face_up |= pile._face_up
+        return resp
+
+    def __str__(self) -> str:
+        return " ".join(str(pile) for pile in self.piles if len(pile))
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({", ".join(repr(pile) for pile in self.piles)})'
@@ -1,10 +1,11 @@
 from core import CardPile, Card
 from .rank import STANDARD_RANKS
 from .suit import STANDARD_SUITS
-import copy
+from .rng import ShuffleRNG
+from typing import Optional
 class Deck52(CardPile):
     ALLCards: list[Card] = [Card(suit=suit, rank=rank) for suit in STANDARD_SUITS for rank in STANDARD_RANKS]
-    def __init__(self, comment: str="") -> None:
-        super().__init__(cards=copy.deepcopy(Deck52.ALLCards), comment=comment)
+    def __init__(self, comment: str="", rng: Optional[ShuffleRNG] = None) -> None:
+        super().__init__(cards=list(Deck52.ALLCards), comment=comment, rng=rng)
     
     
@@ -0,0 +1,43 @@
+import random
+from hashlib import blake2b
+from typing import Optional, Protocol
+
+def derive_seed(*parts: object) -> int:
+    "independent, reproducible 64 bit seed for a path like (master seed, table id, hand number)"
+    return int.from_bytes(blake2b(":".join(str(part) for part in parts).encode(), digest_size=8).digest(), "little")
+
+class ShuffleRNG(Protocol):
+    "What a CardPile needs from a random generator, random.Random satisfies it"
+    def shuffle(self, x: list) -> None: ...
+    def randrange(self, stop: int) -> int: ...
+
+class PermutationBatch():
+    "Shuffles by handing out permutations pre-generated with NumPy, `batch` at a time"
+    "Lists of another length than `size` and randrange fall back to a random.Random seeded from the same seed"
+    def __init__(self, seed: Optional[int] = None, size: int = 52, batch: int = 4096) -> None:
+        import numpy as np
+        self._generator = np.random.default_rng(seed)
+        self._fallback: random.Random = random.Random(derive_seed(seed, "fallback") if seed is not None else None)
+        self.size: int = size
+        self.batch: int = batch
+        self._permutations: list[list[int]] = []
+
+    def _refill(self) -> None:
+        import numpy as np
+        base = np.broadcast_to(np.arange(self.size), (self.batch, self.size))
+        # reversed so pop() hands them out in generation order
+        self._permutations = self._generator.permuted(base, axis=1).tolist()[::-1]
+
+    def permutation(self) -> list[int]:
+        if not self._permutations:
+            self._refill()
+        return self._permutations.pop()
+
+    def shuffle(self, x: list) -> None:
+        if len(x) != self.size:
+            self._fallback.shuffle(x)
+            return
+        x[:] = [x[i] for i in self.permutation()]
+
+    def randrange(self, stop: int) -> int:
+        return self._fallback.randrange(stop)
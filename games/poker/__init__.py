@@ -1,6 +1,9 @@
-from core import CardPile, Card, Rank, Suit, Deck52
+from core import CardPile, Card, CardMask, Rank, Suit, Deck52
 from .chips import Chips
 from .player import Player, ID
 from .table import Table
+from .pots import PotLedger, Pot
+from .agent import Agent, Action, ActionType, Observation, CallAgent, RandomAgent, ConsoleAgent
 from .round import Round
-from .handrank import *
\ No newline at end of file
+from .handrank import *
+from .simulator import Simulator
\ No newline at end of file
@@ -0,0 +1,115 @@
+import random
+from enum import IntEnum
+from typing import NamedTuple, Optional, Protocol
+from . import ID
+from .evaluator import HandState, evaluate_indices
+
+class ActionType(IntEnum):
+    FOLD = 0
+    CALL = 1  # check when there is nothing to call
+    RAISE = 2 # bet or raise, Action.amount is the total bet of the street to raise to
+
+class Action(NamedTuple):
+    type: ActionType
+    amount: int = 0
+
+FOLD = Action(ActionType.FOLD)
+CALL = Action(ActionType.CALL)
+
+class Observation():
+    """What a player sees when asked to act, cards as Card.index and chips as plain ints.
+    strength is evaluated the first time it is read: from the seat's HandState when a Round passes it
+    and no card was added since, from hand + board otherwise, so agents that never read it pay nothing."""
+    __slots__ = ("seat", "street", "hand", "board", "pot", "to_call", "current_bet", "stack", "min_raise",
+                 "players_in", "_strength", "_state")
+    _fields = ("seat", "street", "hand", "board", "pot", "to_call", "current_bet", "stack", "min_raise",
+               "players_in", "strength")
+
+    def __init__(self, seat: int, street: int, hand: tuple[int, ...], board: tuple[int, ...], pot: int, to_call: int,
+                 current_bet: int, stack: int, min_raise: int, players_in: int, strength: int = -1,
+                 state: Optional[HandState] = None) -> None:
+        self.seat: int = seat                   # position in Round.players, the dealer is 0
+        self.street: int = street               # 0 preflop, 1 flop, 2 turn, 3 river
+        self.hand: tuple[int, ...] = hand
+        self.board: tuple[int, ...] = board
+        self.pot: int = pot                     # all chips put in this round, current bets included
+        self.to_call: int = to_call
+        self.current_bet: int = current_bet     # the player's bet on this street
+        self.stack: int = stack
+        self.min_raise: int = min_raise         # smallest legal total bet for a raise
+        self.players_in: int = players_in       # players that have not folded
+        self._strength: int = strength
+        self._state: Optional[HandState] = state
+
+    @property
+    def strength(self) -> int:
+        "evaluator strength of hand + board so far, bigger is better"
+        if self._strength < 0:
+            state = self._state
+            if state is not None and state.count == len(self.hand) + len(self.board):
+                self._strength = state.strength()
+            else:
+                self._strength = evaluate_indices(self.hand + self.board)
+            self._state = None
+        return self._strength
+
+    def _asdict(self) -> dict:
+        return {name: getattr(self, name) for name in self._fields}
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Observation): return NotImplemented
+        return self._asdict() == other._asdict()
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({', '.join(f'{k}={v!r}' for k, v in self._asdict().items())})"
+
+class Agent(Protocol):
+    def act(self, observation: Observation) -> Action: ...
+
+class CallAgent():
+    "checks or calls everything"
+    def act(self, observation: Observation) -> Action:
+        return CALL
+
+class RandomAgent():
+    "folds, calls or min-raises at random, never folds when it can check"
+    def __init__(self, rng: Optional[random.Random] = None, fold: float = 0.2, raise_: float = 0.2) -> None:
+        self.rng: random.Random = rng if rng else random.Random()
+        self.fold: float = fold
+        self.raise_: float = raise_
+
+    def reseed(self, seed: int) -> None:
+        self.rng.seed(seed)
+
+    def act(self, observation: Observation) -> Action:
+        x = self.rng.random()
+        if x < self.fold and observation.to_call:
+            return FOLD
+        if x > 1 - self.raise_:
+            return Action(ActionType.RAISE, observation.min_raise)
+        return CALL
+
+class ConsoleAgent():
+    "asks a human on the terminal"
+    def __init__(self, id: ID) -> None:
+        self.id: ID = id
+
+    def act(self, observation: Observation) -> Action:
+        while True:
+            play = input(f"{self.id=} fold(f), call(c) {observation.to_call}, raise(r <amount>)")
+            if play == 'f':
+                return FOLD
+            elif play == 'c':
+                return CALL
+            elif play[:1] == 'r':
+                try:
+                    amount = int(play.split()[-1])
+                except ValueError:
+                    print("Wrong Input)")
+                    continue
+                if amount < observation.min_raise:
+                    print("Wrong amount...it should be more than call")
+                    continue
+                return Action(ActionType.RAISE, amount)
+            else:
+                print("Wrong Input)")
@@ -0,0 +1,36 @@
+import numpy as np
+from typing import Iterable
+from . import Card
+from .evaluator import CARD_KEYS, MAX_CARDS, ROYAL_FLUSH, _CATEGORY_SHIFT, _FLUSH_SUIT, _FLUSH_TABLE, _RANK_TABLE, _SUIT_BITS, _SUIT_FIELD
+
+# numpy versions of the evaluator tables, the rank table dict becomes a sorted key array + searchsorted
+_NP_CARD_KEYS = np.array(CARD_KEYS, dtype=np.int64)
+_NP_FLUSH_SUIT = np.array(_FLUSH_SUIT, dtype=np.int8)
+_NP_FLUSH_TABLE = np.array(_FLUSH_TABLE, dtype=np.int32)
+_NP_RANK_KEYS = np.array(sorted(_RANK_TABLE), dtype=np.int64)
+_NP_RANK_VALUES = np.array([_RANK_TABLE[key] for key in _NP_RANK_KEYS.tolist()], dtype=np.int32)
+
+def hands_array(hands: Iterable[Iterable[Card]]) -> np.ndarray:
+    "(N, k) array of Card.index from N hands of k cards each"
+    return np.array([[card.index for card in hand] for hand in hands], dtype=np.int8)
+
+def evaluate_batch(cards: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Evaluates every row of an (N, k) array of card indices (0..51, 1 <= k <= 7, no repeats in a row).
+    Returns (strengths, hand_ranks): int32 strengths, equal to evaluator.evaluate of the row,
+    and uint8 HandRank values (1 is ROYAL_FLUSH ... 10 is HIGH_CARD)."""
+    cards = np.asarray(cards)
+    if cards.ndim != 2 or not 1 <= cards.shape[1] <= MAX_CARDS:
+        raise ValueError(f"Expected an (N, 1..{MAX_CARDS}) array of card indices, got shape {cards.shape}.")
+    if cards.size and (cards.min() < 0 or cards.max() > 51):
+        raise ValueError("Card indices must be in 0..51.")
+    cards = cards.astype(np.intp, copy=False)
+    keys = _NP_CARD_KEYS[cards].sum(axis=1)
+    strengths = _NP_RANK_VALUES[np.searchsorted(_NP_RANK_KEYS, keys >> _SUIT_BITS)]
+    flush_suit = _NP_FLUSH_SUIT[keys & _SUIT_FIELD]
+    if (flushes := np.flatnonzero(flush_suit >= 0)).size:
+        rows = cards[flushes]
+        suit = flush_suit[flushes, None]
+        bits = np.where(rows // 13 == suit, np.left_shift(1, rows - 13*suit), 0).sum(axis=1)
+        strengths[flushes] = _NP_FLUSH_TABLE[bits]
+    hand_ranks = (ROYAL_FLUSH + 1 - (strengths >> _CATEGORY_SHIFT)).astype(np.uint8)
+    return strengths, hand_ranks
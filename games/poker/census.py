@@ -0,0 +1,177 @@
+import argparse
+import importlib
+import random
+import time
+from itertools import combinations
+from multiprocessing import Pool
+from typing import Callable, NamedTuple, Optional
+from core.rng import derive_seed
+from . import Card, CardPile, HandRank, HandRankfunc
+from .evaluator import CARD_KEYS, evaluate, _CATEGORY_SHIFT, _FLUSH_SUIT, _FLUSH_TABLE, _RANK_TABLE, _SUIT_BITS, _SUIT_FIELD
+
+# Exhaustive census of all C(52, 7) = 133,784,560 seven card hands.
+# The work is split by the two lowest cards (c0 < c1 <= 46), 1,081 prefixes of very different sizes that are
+# handed out largest first. Within a prefix the remaining five cards are walked in nested loops that carry
+# the additive evaluator key, so every hand costs one addition and one or two table lookups.
+# With a candidate evaluator a seeded random subset (or every hand) is also compared to HandRankfunc.rank_of_hand.
+
+HANDS = 133_784_560
+EXPECTED: dict[HandRank, int] = {
+    HandRank.ROYAL_FLUSH: 4_324,
+    HandRank.STRAIGHT_FLUSH: 37_260,
+    HandRank.FOUR_OF_A_KIND: 224_848,
+    HandRank.FULL_HOUSE: 3_473_184,
+    HandRank.FLUSH: 4_047_644,
+    HandRank.STRAIGHT: 6_180_020,
+    HandRank.THREE_OF_A_KIND: 6_461_620,
+    HandRank.TWO_PAIR: 31_433_400,
+    HandRank.ONE_PAIR: 58_627_800,
+    HandRank.HIGH_CARD: 23_294_460,
+}
+
+Candidate = Callable[[list[Card]], HandRank]
+
+class Census(NamedTuple):
+    counts: dict[HandRank, int]
+    hands: int
+    seconds: float
+    checked: int                            # hands compared with the candidate
+    mismatches: list[tuple[int, ...]]       # Card.index of hands where the candidate disagreed, at most max_mismatches
+
+    @property
+    def hands_per_second(self) -> float:
+        return self.hands / self.seconds if self.seconds else 0.0
+
+def table_candidate(cards: list[Card]) -> HandRank:
+    "the table evaluator as a candidate, a self check of the reference path"
+    return HandRank.from_strength(evaluate(cards))
+
+def load_candidate(path: str) -> Candidate:
+    "'module:function' to the function"
+    module, _, name = path.partition(":")
+    if not name:
+        raise ValueError(f"Candidate must be given as module:function, got {path!r}.")
+    return getattr(importlib.import_module(module), name)
+
+def prefixes() -> list[tuple[int, int]]:
+    "every (c0, c1) prefix that leaves five higher cards, largest first"
+    return sorted(combinations(range(47), 2), key=lambda prefix: prefix[1])
+
+def count_prefix(c0: int, c1: int) -> list[int]:
+    "number of hands per evaluator category (index 1..10) among the hands whose two lowest cards are c0 < c1"
+    counts = [0]*11
+    keys, rank_table, flush_suit, flush_table = CARD_KEYS, _RANK_TABLE, _FLUSH_SUIT, _FLUSH_TABLE
+    shift, suit_bits, suit_field = _CATEGORY_SHIFT, _SUIT_BITS, _SUIT_FIELD
+    k1 = keys[c0] + keys[c1]
+    for c2 in range(c1 + 1, 48):
+        k2 = k1 + keys[c2]
+        for c3 in range(c2 + 1, 49):
+            k3 = k2 + keys[c3]
+            for c4 in range(c3 + 1, 50):
+                k4 = k3 + keys[c4]
+                for c5 in range(c4 + 1, 51):
+                    k5 = k4 + keys[c5]
+                    for c6 in range(c5 + 1, 52):
+                        key = k5 + keys[c6]
+                        s = flush_suit[key & suit_field]
+                        if s < 0:
+                            counts[rank_table[key >> suit_bits] >> shift] += 1
+                        else:
+                            bits = 0
+                            for c in (c0, c1, c2, c3, c4, c5, c6):
+                                if c // 13 == s:
+                                    bits |= 1 << (c - 13*s)
+                            counts[flush_table[bits] >> shift] += 1
+    return counts
+
+def check_prefix(c0: int, c1: int, candidate: Candidate, fraction: float, seed: int,
+                 max_mismatches: int) -> tuple[int, list[tuple[int, ...]]]:
+    "compares the candidate with HandRankfunc.rank_of_hand on a seeded `fraction` of the prefix's hands"
+    rng = random.Random(derive_seed(seed, c0, c1))
+    checked, mismatches = 0, []
+    for rest in combinations(range(c1 + 1, 52), 5):
+        if fraction < 1 and rng.random() >= fraction:
+            continue
+        hand = (c0, c1) + rest
+        cards = [Card.from_index(c) for c in hand]
+        checked += 1
+        if candidate(cards) != HandRankfunc.rank_of_hand(CardPile(cards))[0] and len(mismatches) < max_mismatches:
+            mismatches.append(hand)
+    return checked, mismatches
+
+def _run_prefix(args: tuple[int, int, Optional[Candidate], float, int, int]) -> tuple[list[int], int, list[tuple[int, ...]]]:
+    c0, c1, candidate, fraction, seed, max_mismatches = args
+    counts = count_prefix(c0, c1)
+    if candidate is None or fraction <= 0:
+        return counts, 0, []
+    checked, mismatches = check_prefix(c0, c1, candidate, fraction, seed, max_mismatches)
+    return counts, checked, mismatches
+
+def census(workers: Optional[int] = None, candidate: Optional[Candidate] = None, fraction: float = 0.0,
+           seed: int = 0, max_mismatches: int = 100, limit: Optional[int] = None,
+           progress: Optional[Callable[[int, int], None]] = None) -> Census:
+    """Counts every seven card hand by HandRank over `workers` processes (1 runs in this process).
+    limit only takes that many prefixes (smallest first) for a partial run, progress(done, total) is called
+    after every finished prefix. candidate must be picklable (a module level function) when workers != 1."""
+    if not 0 <= fraction <= 1:
+        raise ValueError(f"fraction must be in 0..1, got {fraction}.")
+    work = prefixes()
+    if limit is not None:
+        work = work[-limit:]
+    tasks = [(c0, c1, candidate, fraction, seed, max_mismatches) for c0, c1 in work]
+    counts = [0]*11
+    checked, mismatches = 0, []
+    start = time.perf_counter()
+    def merge(result: tuple[list[int], int, list[tuple[int, ...]]], done: int) -> None:
+        nonlocal checked
+        for category, n in enumerate(result[0]):
+            counts[category] += n
+        checked += result[1]
+        mismatches.extend(result[2][:max_mismatches - len(mismatches)])
+        if progress:
+            progress(done, len(tasks))
+    if workers == 1:
+        for done, task in enumerate(tasks, 1):
+            merge(_run_prefix(task), done)
+    else:
+        with Pool(workers) as pool:
+            for done, result in enumerate(pool.imap_unordered(_run_prefix, tasks), 1):
+                merge(result, done)
+    seconds = time.perf_counter() - start
+    return Census(
+        counts={HandRank.from_strength(category << _CATEGORY_SHIFT): counts[category] for category in range(10, 0, -1)},
+        hands=sum(counts),
+        seconds=seconds,
+        checked=checked,
+        mismatches=sorted(mismatches),
+    )
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Exhaustive 7 card census with optional differential validation")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="processes, all cores by default")
+    parser.add_argument("--candidate", help="module:function taking a list of 7 Cards and returning a HandRank "
+                                            "(games.poker.census:table_candidate checks the table evaluator)")
+    parser.add_argument("--check", type=float, default=0.001, help="fraction of hands compared with the candidate")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--limit", type=int, help="only the given number of (smallest) prefixes")
+    args = parser.parse_args(argv)
+
+    candidate = load_candidate(args.candidate) if args.candidate else None
+    result = census(args.workers, candidate, args.check if candidate else 0.0, args.seed, limit=args.limit,
+                    progress=lambda done, total: print(f"\r{done}/{total} prefixes", end="", flush=True))
+    print()
+    for rank, count in result.counts.items():
+        expected = f"   expected {EXPECTED[rank]:>12,}" if args.limit is None else ""
+        print(f"{rank.name:<16} {count:>12,}{expected}")
+    print(f"{result.hands:,} hands in {result.seconds:.1f}s -> {result.hands_per_second:,.0f} hands/s")
+    if candidate:
+        print(f"checked {result.checked:,} hands against HandRankfunc.rank_of_hand, {len(result.mismatches)} mismatches")
+        for hand in result.mismatches[:10]:
+            print("  ", " ".join(str(Card.from_index(c)) for c in hand))
+    if args.limit is None and (result.counts != EXPECTED or result.hands != HANDS):
+        raise SystemExit("census does not match the known frequencies")
+    if result.mismatches:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,9 @@
-from functools import total_ordering
-
-@total_ordering
 class Chips:
+    __slots__ = ("_amount",)
+
     def __init__(self, amount: int=0) -> None:
-        self._amount: int = Chips.validate_amount(amount)
+        # the common case skips the call, every bet and every pot makes Chips
+        self._amount: int = amount if type(amount) is int and amount >= 0 else Chips.validate_amount(amount)
     
     @property
     def amount(self) -> int:
@@ -64,6 +64,18 @@ class Chips:
     def __lt__(self, other: Chips) -> bool:
         if not isinstance(other, Chips): return NotImplemented
         return self._amount < other._amount
+
+    def __le__(self, other: Chips) -> bool:
+        if not isinstance(other, Chips): return NotImplemented
+        return self._amount <= other._amount
+
+    def __gt__(self, other: Chips) -> bool:
+        if not isinstance(other, Chips): return NotImplemented
+        return self._amount > other._amount
+
+    def __ge__(self, other: Chips) -> bool:
+        if not isinstance(other, Chips): return NotImplemented
+        return self._amount >= other._amount
     
     def __radd__(self, other: int) -> Chips:
         return NotImplemented
@@ -0,0 +1,137 @@
+import itertools
+import math
+import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple, Optional
+from core.rng import derive_seed
+from . import Round, ID
+from .evaluator import CARD_KEYS, showdown_strengths, split_key
+
+BOARD_SIZE = 5
+_CHUNK = 5_000
+_Z95 = 1.959963984540054
+
+class Equity(NamedTuple):
+    win: float    # share of runouts won outright
+    tie: float    # share of runouts split with someone
+    equity: float # pot share: wins plus split fractions
+    stderr: float # standard error of equity
+
+def chunk_seed(seed: int, chunk: int) -> int:
+    "independent, reproducible 64 bit seed for one chunk of a seeded computation"
+    return derive_seed(seed, chunk)
+
+def live_holdings(round: Round) -> tuple[list[ID], list[list[int]]]:
+    "ids and hole card indices of the players still contesting the pot"
+    ids, holes = [], []
+    for player in round.players:
+        if player.active and not player.folded:
+            ids.append(player.id)
+            holes.append([card.index for card in player.hand])
+    if len(ids) < 2:
+        raise ValueError(f"Equity needs at least two live players, got {len(ids)}.")
+    return ids, holes
+
+def _tally(strengths: list[int], wins: list[int], ties: list[int], shares: list[float], squares: list[float]) -> None:
+    best = max(strengths)
+    winners = [i for i, strength in enumerate(strengths) if strength == best]
+    share = 1/len(winners)
+    for i in winners:
+        if len(winners) == 1:
+            wins[i] += 1
+        else:
+            ties[i] += 1
+        shares[i] += share
+        squares[i] += share*share
+
+def _simulate(holes: list[list[int]], board: list[int], stub: list[int], iterations: int, seed: int):
+    "plays `iterations` random runouts, returns per player (wins, ties, share sum, share sum of squares)"
+    rng = random.Random(seed)
+    needed = BOARD_SIZE - len(board)
+    n = len(holes)
+    wins, ties, shares, squares = [0]*n, [0]*n, [0.0]*n, [0.0]*n
+    hole_parts = [split_key(hole) for hole in holes]
+    for _ in range(iterations):
+        board_key, board_bits = split_key(board + rng.sample(stub, needed))
+        _tally(showdown_strengths(board_key, board_bits, hole_parts), wins, ties, shares, squares)
+    return wins, ties, shares, squares
+
+def exact_equity(round: Round) -> dict[ID, Equity]:
+    """Exact win/tie equity of every live player, enumerating every completion of the board from round.deck.
+    Each board is split into its key and suit masks once and shared by all players."""
+    ids, holes = live_holdings(round)
+    n = len(ids)
+    wins, ties, shares, squares = [0]*n, [0]*n, [0.0]*n, [0.0]*n
+    hole_parts = [split_key(hole) for hole in holes]
+    known_key, known_bits = split_key(card.index for card in round.community_cards)
+    stub = [(CARD_KEYS[card.index], card.index // 13, 1 << (card.index % 13)) for card in round.deck]
+    boards = 0
+    for runout in itertools.combinations(stub, BOARD_SIZE - len(round.community_cards)):
+        board_key, board_bits = known_key, known_bits.copy()
+        for key, suit, bit in runout:
+            board_key += key
+            board_bits[suit] |= bit
+        _tally(showdown_strengths(board_key, board_bits, hole_parts), wins, ties, shares, squares)
+        boards += 1
+    return {ids[i]: Equity(wins[i]/boards, ties[i]/boards, shares[i]/boards, 0.0) for i in range(n)}
+
+def equity(round: Round, iterations: int = 100_000, workers: int = 1, seed: Optional[int] = None,
+           target_ci: Optional[float] = None) -> dict[ID, Equity]:
+    """Monte Carlo win/tie equity of every live player, sampling the rest of the board from round.deck.
+    The work is split in chunks with their own RNG streams derived from seed, so a seeded run gives the same
+    answer for any number of workers. With target_ci set, sampling stops as soon as the 95% confidence
+    interval of every player's equity is narrower than +-target_ci."""
+    if iterations < 1:
+        raise ValueError(f"iterations must be positive, got {iterations=}.")
+    if target_ci is not None and target_ci <= 0:
+        raise ValueError(f"target_ci must be positive, got {target_ci=}.")
+    ids, holes = live_holdings(round)
+    board = [card.index for card in round.community_cards]
+    stub = [card.index for card in round.deck]
+    if seed is None:
+        seed = random.getrandbits(64)
+    if len(board) == BOARD_SIZE:
+        iterations = 1
+    chunks = [min(_CHUNK, iterations - start) for start in range(0, iterations, _CHUNK)]
+    n = len(ids)
+    wins, ties, shares, squares = [0]*n, [0]*n, [0.0]*n, [0.0]*n
+    done = 0
+
+    def merge(result, size: int) -> bool:
+        "adds a finished chunk, returns True once target_ci is met"
+        nonlocal done
+        for total, part in zip((wins, ties, shares, squares), result):
+            for i in range(n):
+                total[i] += part[i]
+        done += size
+        return target_ci is not None and max(_stderr(shares[i], squares[i], done) for i in range(n))*_Z95 <= target_ci
+
+    if workers <= 1:
+        for i, size in enumerate(chunks):
+            if merge(_simulate(holes, board, stub, size, chunk_seed(seed, i)), size):
+                break
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            queue = iter(enumerate(chunks))
+            pending: deque = deque()
+            def submit() -> None:
+                for i, size in itertools.islice(queue, 1):
+                    pending.append((pool.submit(_simulate, holes, board, stub, size, chunk_seed(seed, i)), size))
+            for _ in range(2*workers):
+                submit()
+            while pending:
+                # results are merged in chunk order so early stopping is reproducible
+                future, size = pending.popleft()
+                if merge(future.result(), size):
+                    pool.shutdown(cancel_futures=True)
+                    break
+                submit()
+    return {ids[i]: Equity(wins[i]/done, ties[i]/done, shares[i]/done, _stderr(shares[i], squares[i], done))
+            for i in range(n)}
+
+def _stderr(total: float, squares: float, samples: int) -> float:
+    if samples < 2:
+        return 0.0
+    mean = total/samples
+    return math.sqrt(max(squares/samples - mean*mean, 0.0)/(samples - 1))
@@ -0,0 +1,84 @@
+import threading
+from collections import OrderedDict
+from typing import Iterable, NamedTuple
+from . import Card, CardMask
+from .evaluator import best_five, evaluate_mask
+
+# Bounded memo of hand evaluations. The key is the set of cards as a 52-bit int (bit Card.index), so
+# any order of the same cards hits the same entry and the caller's cards are only read. An entry holds
+# the strength and the Card.index of the best five cards in order of importance, the part of
+# rank_of_hand that is worth remembering. Least recently used entries are evicted past maxsize.
+# One lock guards the entries and counters; a miss is evaluated outside of it, two threads missing the
+# same set at once both evaluate it and store the same entry.
+
+class CacheStats(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    maxsize: int
+
+    @property
+    def hit_rate(self) -> float:
+        calls = self.hits + self.misses
+        return self.hits / calls if calls else 0.0
+
+class EvalCache():
+    "LRU of (strength, best five) by card set, safe to share between threads"
+    def __init__(self, maxsize: int = 1 << 16) -> None:
+        if maxsize < 1:
+            raise ValueError(f"maxsize must be positive, got {maxsize}.")
+        self.maxsize: int = maxsize
+        self._entries: OrderedDict[int, tuple[int, tuple[int, ...]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = self._misses = self._evictions = 0
+
+    @staticmethod
+    def key_of(cards: Iterable[Card] | CardMask | int) -> int:
+        if isinstance(cards, (CardMask, int)):
+            return int(cards)
+        key = 0
+        for card in cards:
+            key |= 1 << card.index
+        return key
+
+    def lookup(self, key: int) -> tuple[int, tuple[int, ...]]:
+        "(strength, Card.index of the best five cards) of the card set `key`"
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry
+            self._misses += 1
+        strength = evaluate_mask(key)
+        entry = (strength, tuple(card.index for card in best_five(CardMask(key).to_cards(), strength)))
+        with self._lock:
+            self._entries[key] = entry
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return entry
+
+    def strength(self, cards: Iterable[Card] | CardMask | int) -> int:
+        return self.lookup(self.key_of(cards))[0]
+
+    def best(self, cards: Iterable[Card] | CardMask | int) -> tuple[int, list[Card]]:
+        "strength and the best five cards in order of importance, like best_five"
+        strength, five = self.lookup(self.key_of(cards))
+        return strength, [Card.from_index(index) for index in five]
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(self._hits, self._misses, self._evictions, len(self._entries), self.maxsize)
+
+    def clear(self) -> None:
+        "drops the entries and resets the counters"
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = self._evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+EVAL_CACHE = EvalCache()
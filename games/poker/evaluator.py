@@ -0,0 +1,233 @@
+from typing import Iterable
+from . import Card, CardMask, Rank
+
+# Table driven hand evaluator.
+#
+# Cards are used by their Card.index and every card gets an additive key:
+#   (5**rank_index) << 12  |  1 << (3*suit_index)
+# Summing the keys of up to 7 cards gives
+#   * low 12 bits  -> four 3-bit suit counters (used to detect a flush)
+#   * high bits    -> base-5 rank histogram, a perfect hash of the rank multiset
+# so a hand is evaluated with one addition per card and one or two table lookups.
+#
+# Strength is a single int, bigger is better:
+#   category << 20 | five 4-bit rank nibbles (the ranks of the best five cards in order)
+
+MAX_CARDS = 7
+
+HIGH_CARD, ONE_PAIR, TWO_PAIR, THREE_OF_A_KIND, STRAIGHT, FLUSH, FULL_HOUSE, FOUR_OF_A_KIND, STRAIGHT_FLUSH, ROYAL_FLUSH = range(1, 11)
+_CATEGORY_SHIFT = 20
+_SUIT_BITS = 12
+_SUIT_FIELD = (1 << _SUIT_BITS) - 1
+_WHEEL = 0b1_0000_0000_1111 # A 5 4 3 2
+
+CARD_KEYS: list[int] = [(5**r << _SUIT_BITS) | 1 << (3*s) for s in range(4) for r in range(13)]
+
+def _pack(category: int, ranks: list[int]) -> int:
+    strength = category
+    for i in range(5):
+        strength = strength << 4 | (ranks[i] if i < len(ranks) else 0)
+    return strength
+
+def _straight_high(bits: int) -> int:
+    "rank of the highest card of the best straight in the 13-bit rank mask, 0 if none"
+    for high in range(14, 5, -1):
+        window = 0b11111 << (high - 6)
+        if bits & window == window:
+            return high
+    if bits & _WHEEL == _WHEEL:
+        return 5
+    return 0
+
+def _straight_ranks(high: int) -> list[int]:
+    if high == 5:
+        return [5, 4, 3, 2, 14]
+    return list(range(high, high - 5, -1))
+
+def _flush_strength(bits: int) -> int:
+    if (high := _straight_high(bits)):
+        return _pack(ROYAL_FLUSH if high == 14 else STRAIGHT_FLUSH, _straight_ranks(high))
+    return _pack(FLUSH, [r + 2 for r in range(12, -1, -1) if bits >> r & 1][:5])
+
+def _rank_strength(groups: list[tuple[int, int]], bits: int) -> int:
+    "strength of a hand without a flush from its (count, rank) groups in descending rank order"
+    if not groups:
+        return 0
+    ordered = sorted(groups, key=lambda g: g[0], reverse=True)
+    top, second = ordered[0][0], (ordered[1][0] if len(ordered) > 1 else 0)
+    if top == 4:
+        made, category = 1, FOUR_OF_A_KIND
+    elif top == 3 and second >= 2:
+        return _pack(FULL_HOUSE, [ordered[0][1]]*3 + [ordered[1][1]]*2)
+    elif (high := _straight_high(bits)):
+        return _pack(STRAIGHT, _straight_ranks(high))
+    elif top == 3:
+        made, category = 1, THREE_OF_A_KIND
+    elif top == 2 and second == 2:
+        made, category = 2, TWO_PAIR
+    elif top == 2:
+        made, category = 1, ONE_PAIR
+    else:
+        made, category = 0, HIGH_CARD
+    ranks = [r for c, r in ordered[:made] for _ in range(c)]
+    ranks += [r for _, r in groups if r not in ranks][:5 - len(ranks)]
+    return _pack(category, ranks)
+
+def _fill_rank_table(table: dict[int, int], rank: int, cards: int, key: int, bits: int,
+                     groups: list[tuple[int, int]]) -> None:
+    "walks every rank histogram (at most 4 cards per rank) from the Ace down to the Two"
+    if rank < 0:
+        table[key] = _rank_strength(groups, bits)
+        return
+    _fill_rank_table(table, rank - 1, cards, key, bits, groups)
+    for c in range(1, min(4, cards) + 1):
+        _fill_rank_table(table, rank - 1, cards - c, key + c * 5**rank, bits | 1 << rank, groups + [(c, rank + 2)])
+
+def _build_rank_table() -> dict[int, int]:
+    table: dict[int, int] = {}
+    _fill_rank_table(table, 12, MAX_CARDS, 0, 0, [])
+    return table
+
+def _build_flush_suit_table() -> list[int]:
+    table = [-1] * (1 << _SUIT_BITS)
+    for key in range(1 << _SUIT_BITS):
+        for s in range(4):
+            if (key >> 3*s) & 0b111 >= 5:
+                table[key] = s
+    return table
+
+_RANK_TABLE: dict[int, int] = _build_rank_table()
+_FLUSH_SUIT: list[int] = _build_flush_suit_table()
+_FLUSH_TABLE: list[int] = [_flush_strength(bits) if bits.bit_count() >= 5 else 0 for bits in range(1 << 13)]
+
+def evaluate_indices(cards: Iterable[int]) -> int:
+    "strength of a hand of at most 7 cards given by their 0..51 indices"
+    if not isinstance(cards, (list, tuple)):
+        cards = tuple(cards) # read twice, an iterator would be used up by the first loop
+    key = 0
+    for c in cards:
+        key += CARD_KEYS[c]
+    s = _FLUSH_SUIT[key & _SUIT_FIELD]
+    if s < 0:
+        return _RANK_TABLE[key >> _SUIT_BITS]
+    bits = 0
+    for c in cards:
+        if c // 13 == s:
+            bits |= 1 << (c - 13*s)
+    return _FLUSH_TABLE[bits]
+
+def split_key(cards: Iterable[int]) -> tuple[int, list[int]]:
+    """(summed key, per suit 13-bit rank masks) of some card indices, a partial hand that can be
+    combined with others by adding keys and or-ing masks, see evaluate_split"""
+    key = 0
+    suit_bits = [0, 0, 0, 0]
+    for c in cards:
+        key += CARD_KEYS[c]
+        suit_bits[c // 13] |= 1 << (c % 13)
+    return key, suit_bits
+
+def evaluate_split(key: int, suit_bits: list[int]) -> int:
+    "strength of a hand given as split_key parts"
+    s = _FLUSH_SUIT[key & _SUIT_FIELD]
+    if s < 0:
+        return _RANK_TABLE[key >> _SUIT_BITS]
+    return _FLUSH_TABLE[suit_bits[s]]
+
+def max_suit_count(key: int) -> int:
+    "the most cards of a single suit in a split_key key"
+    field = key & _SUIT_FIELD
+    return max(field & 7, field >> 3 & 7, field >> 6 & 7, field >> 9 & 7)
+
+class HandState():
+    """A player's cards as split_key parts (the key holds the rank histogram and suit counts), updated
+    in O(1) per dealt card. The strength is computed once after a change and cached until the next card."""
+    __slots__ = ("key", "suit_bits", "count", "_strength")
+
+    def __init__(self, cards: Iterable[int] = ()) -> None:
+        self.key, self.suit_bits = split_key(cards)
+        self.count: int = sum(self.key >> 3*s & 7 for s in range(4))
+        self._strength: int = -1
+
+    def add(self, card: int) -> None:
+        if self.count == MAX_CARDS:
+            raise ValueError(f"A hand holds at most {MAX_CARDS} cards.")
+        self.key += CARD_KEYS[card]
+        self.suit_bits[card // 13] |= 1 << (card % 13)
+        self.count += 1
+        self._strength = -1
+
+    def copy(self) -> HandState:
+        resp = HandState.__new__(HandState)
+        resp.key, resp.suit_bits, resp.count, resp._strength = self.key, self.suit_bits.copy(), self.count, self._strength
+        return resp
+
+    def strength(self) -> int:
+        if self._strength < 0:
+            self._strength = evaluate_split(self.key, self.suit_bits)
+        return self._strength
+
+    def category(self) -> int:
+        return self.strength() >> _CATEGORY_SHIFT
+
+    def rank_bits(self) -> int:
+        "13-bit mask of the ranks held"
+        return self.suit_bits[0] | self.suit_bits[1] | self.suit_bits[2] | self.suit_bits[3]
+
+def showdown_strengths(board_key: int, board_bits: list[int], holes: list[tuple[int, list[int]]]) -> list[int]:
+    """strength of every (key, suit_bits) hole against one board given as split_key parts,
+    when the board has fewer than 3 cards of any suit the flush lookup is skipped for all players"""
+    if max_suit_count(board_key) < 3:
+        return [_RANK_TABLE[(board_key + key) >> _SUIT_BITS] for key, _ in holes]
+    resp = []
+    for key, bits in holes:
+        key += board_key
+        s = _FLUSH_SUIT[key & _SUIT_FIELD]
+        resp.append(_RANK_TABLE[key >> _SUIT_BITS] if s < 0 else _FLUSH_TABLE[board_bits[s] | bits[s]])
+    return resp
+
+def evaluate(cards: Iterable[Card]) -> int:
+    "strength of a hand of at most 7 cards, bigger is better"
+    return evaluate_indices([card.index for card in cards])
+
+def evaluate_mask(mask: CardMask|int) -> int:
+    "strength of a hand of at most 7 cards given as a CardMask"
+    bits = int(mask)
+    key = 0
+    rest = bits
+    while rest:
+        low = rest & -rest
+        key += CARD_KEYS[low.bit_length() - 1]
+        rest ^= low
+    s = _FLUSH_SUIT[key & _SUIT_FIELD]
+    if s < 0:
+        return _RANK_TABLE[key >> _SUIT_BITS]
+    return _FLUSH_TABLE[(bits >> 13*s) & 0x1FFF]
+
+def category(strength: int) -> int:
+    "HIGH_CARD .. ROYAL_FLUSH category of a strength"
+    return strength >> _CATEGORY_SHIFT
+
+def strength_ranks(strength: int) -> list[Rank]:
+    "ranks of the best five cards encoded in strength, in order of importance"
+    ranks = []
+    for shift in range(16, -4, -4):
+        if (r := strength >> shift & 0xF):
+            ranks.append(Rank(r))
+    return ranks
+
+def best_five(cards: Iterable[Card], strength: int) -> list[Card]:
+    "picks the cards out of the hand that make up the given strength"
+    pool = list(cards)
+    if category(strength) in (FLUSH, STRAIGHT_FLUSH, ROYAL_FLUSH):
+        suit_counts: dict = {}
+        for card in pool:
+            suit_counts[card.suit] = suit_counts.get(card.suit, 0) + 1
+        f_suit = max(suit_counts, key=suit_counts.__getitem__)
+        pool = [card for card in pool if card.suit == f_suit]
+    ans = []
+    for rank in strength_ranks(strength):
+        for i, card in enumerate(pool):
+            if card.rank == rank:
+                ans.append(pool.pop(i))
+                break
+    return ans
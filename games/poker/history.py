@@ -0,0 +1,225 @@
+from typing import BinaryIO, Iterator, NamedTuple, Optional
+from . import Card, CardPile, Chips, Player, Table, Round, ID
+from .agent import Action, ActionType, Observation
+
+# Append-only hand history.
+#
+# File layout: magic b"PHH1", then one record per hand: varint payload length, payload.
+# Payload (varints unless noted):
+#   round id, blind amount, players n (u8)
+#   n times   : id length, id utf-8 bytes, stack at the start of the round        (seat order, dealer first)
+#   2n u8     : hole cards as Card.index, two per seat
+#   u8 count + u8 cards : burns,  u8 count + u8 cards : community cards           (deal order)
+#   actions   : count, then per action seat (u8), street << 2 | ActionType (u8), current bet after it
+#   winners   : count (u8), then per winner seat (u8), chips won
+# The whole deal order is hole cards round by round from the dealer, then burn + street cards per street,
+# so a record rebuilds the deck of the round, see replay.
+
+MAGIC = b"PHH1"
+
+class ActionRecord(NamedTuple):
+    seat: int
+    street: int
+    type: ActionType
+    amount: int # the player's bet on the street after the action
+
+class HandRecord(NamedTuple):
+    round_id: int
+    blind: int
+    players: tuple[ID, ...]
+    stacks: tuple[int, ...]
+    holes: tuple[tuple[int, int], ...]
+    burns: tuple[int, ...]
+    board: tuple[int, ...]
+    actions: tuple[ActionRecord, ...]
+    won: tuple[tuple[int, int], ...] # (seat, chips)
+
+def _put_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+def _get_varint(data: bytes, pos: int) -> tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+def record_of(round: Round) -> HandRecord:
+    seats = {player.id: seat for seat, player in enumerate(round.players)}
+    return HandRecord(
+        round_id=round.id,
+        blind=int(round.table.blind_amount),
+        players=tuple(player.id for player in round.players),
+        stacks=tuple(round.start_stacks),
+        holes=tuple(round.hole_indices), # type: ignore
+        burns=tuple(card.index for card in round.burns),
+        board=round.board_indices,
+        actions=tuple(ActionRecord(*action) for action in round.actions),
+        won=tuple((seats[id], int(chips)) for id, chips in round.won.items()),
+    )
+
+def encode(record: HandRecord) -> bytes:
+    out = bytearray()
+    _put_varint(out, record.round_id)
+    _put_varint(out, record.blind)
+    out.append(len(record.players))
+    for id, stack in zip(record.players, record.stacks):
+        name = id.encode()
+        _put_varint(out, len(name))
+        out += name
+        _put_varint(out, stack)
+    for hole in record.holes:
+        out += bytes(hole)
+    for cards in (record.burns, record.board):
+        out.append(len(cards))
+        out += bytes(cards)
+    _put_varint(out, len(record.actions))
+    for action in record.actions:
+        out.append(action.seat)
+        out.append(action.street << 2 | action.type)
+        _put_varint(out, action.amount)
+    out.append(len(record.won))
+    for seat, chips in record.won:
+        out.append(seat)
+        _put_varint(out, chips)
+    return bytes(out)
+
+def decode(data: bytes) -> HandRecord:
+    round_id, pos = _get_varint(data, 0)
+    blind, pos = _get_varint(data, pos)
+    n = data[pos]
+    pos += 1
+    players, stacks = [], []
+    for _ in range(n):
+        length, pos = _get_varint(data, pos)
+        players.append(data[pos:pos + length].decode())
+        stack, pos = _get_varint(data, pos + length)
+        stacks.append(stack)
+    holes = tuple((data[pos + 2*i], data[pos + 2*i + 1]) for i in range(n))
+    pos += 2*n
+    burns = tuple(data[pos + 1:pos + 1 + data[pos]])
+    pos += 1 + len(burns)
+    board = tuple(data[pos + 1:pos + 1 + data[pos]])
+    pos += 1 + len(board)
+    count, pos = _get_varint(data, pos)
+    actions = []
+    for _ in range(count):
+        seat, kind = data[pos], data[pos + 1]
+        amount, pos = _get_varint(data, pos + 2)
+        actions.append(ActionRecord(seat, kind >> 2, ActionType(kind & 3), amount))
+    won = []
+    count, pos = data[pos], pos + 1
+    for _ in range(count):
+        seat = data[pos]
+        chips, pos = _get_varint(data, pos + 1)
+        won.append((seat, chips))
+    return HandRecord(round_id, blind, tuple(players), tuple(stacks), holes, burns, board, tuple(actions), tuple(won))
+
+class HistoryWriter():
+    "Appends hands to a history file, pass it to Round (or Simulator) as history to log every played round"
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        self._file: BinaryIO = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+        self.hands: int = 0
+
+    def write(self, round: Round) -> None:
+        self.write_record(record_of(round))
+
+    def write_record(self, record: HandRecord) -> None:
+        payload = encode(record)
+        prefix = bytearray()
+        _put_varint(prefix, len(payload))
+        self._file.write(prefix + payload)
+        self.hands += 1
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> HistoryWriter:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def read_history(path: str) -> Iterator[HandRecord]:
+    "streams the records of a history file in order, only one record is in memory at a time"
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a hand history file.")
+        while True:
+            length = shift = 0
+            while (byte := file.read(1)):
+                length |= (byte[0] & 0x7F) << shift
+                shift += 7
+                if byte[0] < 0x80:
+                    break
+            else:
+                if shift:
+                    raise ValueError(f"Truncated record length at the end of {path}.")
+                return
+            payload = file.read(length)
+            if len(payload) != length:
+                raise ValueError(f"Truncated record at the end of {path}.")
+            yield decode(payload)
+
+def deal_order(record: HandRecord) -> list[int]:
+    "every dealt card as Card.index in the order it left the deck"
+    order = [hole[0] for hole in record.holes] + [hole[1] for hole in record.holes]
+    board = list(record.board)
+    for burn, cards in zip(record.burns, (3, 1, 1)):
+        order.append(burn)
+        order += board[:cards]
+        del board[:cards]
+    return order
+
+class _StopReplay(Exception):
+    pass
+
+class _ScriptAgent():
+    "plays back recorded actions, stops the replay before action number `stop`"
+    def __init__(self, actions: tuple[ActionRecord, ...], stop: Optional[int]) -> None:
+        self.actions = actions
+        self.stop: int = len(actions) if stop is None else stop
+        self.next: int = 0
+
+    def act(self, observation: Observation) -> Action:
+        if self.next >= self.stop:
+            raise _StopReplay()
+        action = self.actions[self.next]
+        if action.seat != observation.seat or action.street != observation.street:
+            raise ValueError(f"Recorded action {self.next} of seat {action.seat} on street {action.street} does not "
+                             f"match the replay, seat {observation.seat} on street {observation.street} is to act.")
+        self.next += 1
+        return Action(action.type, action.amount)
+
+def replay(record: HandRecord, actions: Optional[int] = None) -> Round:
+    """Rebuilds the round of a record on a fresh table, played up to (not including) action number
+    `actions`, or to the end when None. The returned Round is live, a stopped one can be played on by hand."""
+    if actions is not None and not 0 <= actions <= len(record.actions):
+        raise ValueError(f"Action index {actions} is out of range, the hand has {len(record.actions)} actions.")
+    players = [Player(id, Chips(stack)) for id, stack in zip(record.players, record.stacks)]
+    table = Table(players, Chips(record.blind))
+    for player, stack in zip(players, record.stacks):
+        player.bankroll, player.stack = Chips(0), Chips(stack)
+    table.round_count = record.round_id - 1
+    dealt = deal_order(record)
+    rest = sorted(set(range(52)) - set(dealt))
+    deck = CardPile([Card.from_index(index) for index in rest + dealt[::-1]], f"Replay deck of round {record.round_id}")
+    agent = _ScriptAgent(record.actions, actions)
+    round = Round(table, {id: agent for id in record.players}, deck=deck)
+    try:
+        round.play()
+    except _StopReplay:
+        pass
+    return round
@@ -0,0 +1,191 @@
+from bisect import bisect_right
+from itertools import product
+from math import comb
+from typing import Iterable, NamedTuple, Optional, Sequence
+from . import Card
+
+# Suit isomorphism: hands that differ only by a renaming of suits are one class, with a dense index.
+# A HandIndexer is built for the rounds cards come in, the order within a round does not matter.
+# STREETS index hole cards and the board as a set (169, 1,286,792, 13,960,050 and 123,156,254 classes),
+# which is what equity depends on. ORDERED keeps flop, turn and river apart for street aware lookups.
+#
+# Per suit the ranks dealt in each round, re-numbered among the ranks of that suit still undealt,
+# give a colex index; the rounds are combined in mixed radix into one suit index below suit_count(sizes).
+# Sorting the suits by (cards per round, suit index) makes the hand canonical. The sorted cards-per-round
+# vectors are the hand's configuration; suits sharing a vector can be swapped freely, so their suit indices
+# form a multiset, ranked with combinations with repetition. index = offset of the configuration + the
+# mixed radix of the multiset ranks of its groups.
+
+Sizes = tuple[int, ...] # cards of one suit in each round
+
+class _Group(NamedTuple):
+    sizes: Sizes
+    suits: int          # suits with these sizes
+    count: int          # suit indices of one such suit
+    combinations: int   # multisets of `suits` suit indices
+
+class _Round(NamedTuple):
+    configurations: list[tuple[_Group, ...]]
+    offsets: list[int]              # first index of each configuration, ascending
+    by_key: dict[tuple[Sizes, ...], tuple[int, tuple[_Group, ...]]]
+    size: int
+
+def suit_count(sizes: Sizes) -> int:
+    "suit indices of a suit holding sizes[k] ranks in round k"
+    resp, left = 1, 13
+    for n in sizes:
+        resp *= comb(left, n)
+        left -= n
+    return resp
+
+def _build(rounds: Sequence[int]) -> _Round:
+    keys = set()
+    for split in product(*(_spread(n) for n in rounds)):
+        keys.add(tuple(sorted((tuple(cards[s] for cards in split) for s in range(4)), reverse=True)))
+    configurations, offsets, by_key, total = [], [], {}, 0
+    for key in sorted(keys, reverse=True):
+        groups = []
+        for sizes in sorted(set(key), reverse=True):
+            suits, count = key.count(sizes), suit_count(sizes)
+            groups.append(_Group(sizes, suits, count, comb(count + suits - 1, suits)))
+        configurations.append(tuple(groups))
+        offsets.append(total)
+        by_key[key] = (total, tuple(groups))
+        size = 1
+        for group in groups:
+            size *= group.combinations
+        total += size
+    return _Round(configurations, offsets, by_key, total)
+
+def _spread(n: int) -> list[tuple[int, ...]]:
+    "every way to split n cards over the four suits"
+    return [split for split in product(range(n + 1), repeat=4) if sum(split) == n]
+
+def _colex(positions: Iterable[int]) -> int:
+    return sum(comb(p, i) for i, p in enumerate(positions, 1))
+
+def _uncolex(rank: int, n: int) -> list[int]:
+    "ascending positions of the n-subset with colex rank `rank`"
+    resp = [0]*n
+    for i in range(n, 0, -1):
+        # largest p with comb(p, i) <= rank
+        low, high = i - 1, rank + i
+        while low < high:
+            mid = (low + high + 1) // 2
+            if comb(mid, i) <= rank:
+                low = mid
+            else:
+                high = mid - 1
+        rank -= comb(low, i)
+        resp[i - 1] = low
+    return resp
+
+class HandIndexer():
+    "dense index of the suit isomorphism classes of cards dealt in `rounds` (cards per round)"
+    def __init__(self, rounds: Sequence[int]) -> None:
+        if sum(rounds) > 7 or not all(n > 0 for n in rounds):
+            raise ValueError(f"Rounds must deal at least one card each and at most 7 in all, got {rounds}.")
+        self.rounds: tuple[int, ...] = tuple(rounds)
+        self._tables: list[_Round] = [_build(self.rounds[:k + 1]) for k in range(len(self.rounds))]
+
+    def size(self, round: Optional[int] = None) -> int:
+        "number of classes after `round` (default the last)"
+        return self._tables[len(self.rounds) - 1 if round is None else round].size
+
+    def index_of(self, cards: Sequence[int], round: Optional[int] = None) -> int:
+        "index of Card.index values dealt in the order of the rounds, up to `round` (default the last)"
+        round = len(self.rounds) - 1 if round is None else round
+        table = self._tables[round]
+        masks = [[0]*(round + 1) for _ in range(4)]
+        start = 0
+        for k in range(round + 1):
+            for card in cards[start:start + self.rounds[k]]:
+                masks[card // 13][k] |= 1 << (card % 13)
+            start += self.rounds[k]
+        if start != len(cards):
+            raise ValueError(f"Round {round} has {start} cards, got {len(cards)}.")
+        suits = []
+        for rounds in masks:
+            sizes, value, used = [], 0, 0
+            for mask in rounds:
+                n = mask.bit_count()
+                positions = []
+                bits = mask
+                while bits:
+                    low = bits & -bits
+                    positions.append(low.bit_length() - 1 - (used & (low - 1)).bit_count())
+                    bits ^= low
+                value = value*comb(13 - used.bit_count(), n) + _colex(positions)
+                if used & mask:
+                    raise ValueError("A card is dealt twice.")
+                used |= mask
+                sizes.append(n)
+            suits.append((tuple(sizes), value))
+        if sum(sum(sizes) for sizes, _ in suits) != len(cards):
+            raise ValueError("A card is dealt twice.")
+        suits.sort(reverse=True)
+        offset, groups = table.by_key[tuple(sizes for sizes, _ in suits)]
+        resp, s = 0, 0
+        for group in groups:
+            m = group.suits
+            # suit indices a_1 >= ... >= a_m as the strictly decreasing a_j + m - j, ranked colex
+            rank = sum(comb(suits[s + j][1] + m - 1 - j, m - j) for j in range(m))
+            resp = resp*group.combinations + rank
+            s += m
+        return offset + resp
+
+    def unindex_of(self, index: int, round: Optional[int] = None) -> list[int]:
+        "canonical Card.index values of a class, in the order of the rounds"
+        round = len(self.rounds) - 1 if round is None else round
+        table = self._tables[round]
+        if not 0 <= index < table.size:
+            raise ValueError(f"Index {index} is out of range for round {round}, it has {table.size} classes.")
+        c = bisect_right(table.offsets, index) - 1
+        rest = index - table.offsets[c]
+        suits: list[tuple[Sizes, int]] = []
+        for group in reversed(table.configurations[c]):
+            rest, rank = divmod(rest, group.combinations)
+            m = group.suits
+            b = _uncolex(rank, m)[::-1]
+            suits[:0] = [(group.sizes, b[j] - (m - 1 - j)) for j in range(m)]
+        dealt: list[list[int]] = [[] for _ in range(round + 1)]
+        for suit, (sizes, value) in enumerate(suits):
+            radices, left = [], 13
+            for n in sizes:
+                radices.append(comb(left, n))
+                left -= n
+            ranks = []
+            for radix in reversed(radices):
+                value, rank = divmod(value, radix)
+                ranks.append(rank)
+            free = list(range(13))
+            for k, (n, rank) in enumerate(zip(sizes, reversed(ranks))):
+                positions = _uncolex(rank, n)
+                taken = [free[p] for p in positions]
+                dealt[k] += [13*suit + r for r in taken]
+                free = [r for r in free if r not in taken]
+        return [card for cards in dealt for card in cards]
+
+STREETS: list[HandIndexer] = [HandIndexer((2,)), HandIndexer((2, 3)), HandIndexer((2, 4)), HandIndexer((2, 5))]
+ORDERED = HandIndexer((2, 3, 1, 1))
+_STREET = {0: 0, 3: 1, 4: 2, 5: 3}
+
+def _street(hole: list[int], board: list[int]) -> int:
+    if len(hole) != 2 or len(board) not in _STREET:
+        raise ValueError(f"Expected 2 hole cards and 0, 3, 4 or 5 board cards, got {len(hole)} and {len(board)}.")
+    return _STREET[len(board)]
+
+def index(hole: Iterable[Card], board: Iterable[Card] = ()) -> int:
+    "class of hole cards and a board of 0, 3, 4 or 5 cards (CardPiles work too) among STREETS[street]"
+    cards, board = [card.index for card in hole], [card.index for card in board]
+    return STREETS[_street(cards, board)].index_of(cards + board)
+
+def unindex(index: int, street: int) -> tuple[list[Card], list[Card]]:
+    "canonical (hole, board) of a class of STREETS[street]"
+    cards = [Card.from_index(card) for card in STREETS[street].unindex_of(index)]
+    return cards[:2], cards[2:]
+
+def canonical(hole: Iterable[Card], board: Iterable[Card] = ()) -> tuple[list[Card], list[Card]]:
+    "the representative of the class of a hand, the same for every suit renaming of it"
+    board = list(board)
+    return unindex(index(hole, board), _STREET[len(board)])
@@ -0,0 +1,111 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import NamedTuple, Optional
+from core.rng import derive_seed
+from .agent import ActionType, Observation, RandomAgent
+from .server import GameServer
+
+# Load client for games.poker.server: `seats` RandomAgent bots at each of `tables` tables, spread over
+# `connections` sockets, each table plays `hands` hands and then its bots leave.
+
+_TYPE_NAMES = {ActionType.FOLD: "fold", ActionType.CALL: "call", ActionType.RAISE: "raise"}
+
+class LoadReport(NamedTuple):
+    tables: int
+    hands: int
+    actions: int
+    errors: int
+    seconds: float
+
+    @property
+    def hands_per_second(self) -> float:
+        return self.hands / self.seconds if self.seconds else 0.0
+
+    @property
+    def actions_per_second(self) -> float:
+        return self.actions / self.seconds if self.seconds else 0.0
+
+async def run_load(tables: int, hands: int, seats: int = 2, connections: int = 8, seed: int = 0,
+                   host: str = "127.0.0.1", port: Optional[int] = None, unix: Optional[str] = None) -> LoadReport:
+    results = [0]*tables
+    counts = {"actions": 0, "errors": 0}
+    bots = {(t, f"S{s}"): RandomAgent(random.Random(derive_seed(seed, t, s))) for t in range(tables) for s in range(seats)}
+
+    async def client(table_ids: list[int]) -> None:
+        if unix:
+            reader, writer = await asyncio.open_unix_connection(unix)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        def send(message: dict) -> None:
+            writer.write(json.dumps(message).encode() + b"\n")
+        for t in table_ids:
+            for s in range(seats):
+                send({"op": "sit", "table": t, "player": f"S{s}"})
+        await writer.drain()
+        remaining = len(table_ids)
+        try:
+            while remaining and (line := await reader.readline()):
+                message = json.loads(line)
+                op = message["op"]
+                if op == "act" and results[message["table"]] < hands: # acts that cross our leave stay unanswered
+                    t, id = message["table"], message["player"]
+                    action = bots[t, id].act(Observation(**message["observation"]))
+                    send({"op": "action", "table": t, "player": id, "seq": message["seq"],
+                          "type": _TYPE_NAMES[action.type], "amount": action.amount})
+                    counts["actions"] += 1
+                elif op == "result":
+                    t = message["table"]
+                    results[t] += 1
+                    if results[t] == hands:
+                        for s in range(seats):
+                            send({"op": "leave", "table": t, "player": f"S{s}"})
+                        remaining -= 1
+                elif op == "error":
+                    counts["errors"] += 1
+                await writer.drain()
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    groups = [list(range(c, tables, connections)) for c in range(min(connections, tables))]
+    await asyncio.gather(*(client(group) for group in groups))
+    return LoadReport(tables, sum(min(n, hands) for n in results), counts["actions"], counts["errors"],
+                      time.perf_counter() - start)
+
+async def local_load(tables: int, hands: int, seats: int = 2, connections: int = 8, seed: int = 0,
+                     action_timeout: float = 10.0) -> tuple[LoadReport, GameServer]:
+    "runs a GameServer in this event loop and drives it over TCP on a free local port"
+    server = GameServer(tables, seed=seed, action_timeout=action_timeout)
+    port = await server.start_tcp()
+    try:
+        report = await run_load(tables, hands, seats, connections, seed, port=port)
+    finally:
+        await server.close()
+    return report, server
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Load client for games.poker.server")
+    parser.add_argument("--tables", type=int, default=100)
+    parser.add_argument("--hands", type=int, default=20, help="hands per table")
+    parser.add_argument("--seats", type=int, default=2, help="bots per table")
+    parser.add_argument("--connections", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="connect to this Unix socket instead of TCP")
+    parser.add_argument("--local", action="store_true", help="start a server in this process")
+    args = parser.parse_args(argv)
+
+    if args.local:
+        report, _ = asyncio.run(local_load(args.tables, args.hands, args.seats, args.connections, args.seed))
+    else:
+        report = asyncio.run(run_load(args.tables, args.hands, args.seats, args.connections, args.seed,
+                                      args.host, args.port, args.unix))
+    print(f"{report.tables} tables, {report.hands:,} hands, {report.actions:,} actions, {report.errors} errors "
+          f"in {report.seconds:.2f}s -> {report.hands_per_second:,.0f} hands/s, {report.actions_per_second:,.0f} actions/s")
+
+if __name__ == "__main__":
+    main()
@@ -16,10 +16,20 @@ class Player:
         self.hand: CardPile
         self.folded = False
         self.all_in: bool = False
-        self.last_pot_index = -1
         self.current_bet: Chips = Chips(0)
 
+    def clone(self) -> Player:
+        "an independent copy, hand included"
+        resp = Player.__new__(Player)
+        resp.__dict__.update(self.__dict__)
+        for name in ("bankroll", "stack", "current_bet"):
+            setattr(resp, name, Chips(int(getattr(self, name))))
+        if hasattr(self, "hand"):
+            resp.hand = self.hand.copy()
+        return resp
+
     def shift_to_stack(self, amount: Chips) -> None:
+        amount = Chips(amount.amount) # callers may pass the bankroll itself, e.g. min(bankroll, max_buyin)
         if amount > self.bankroll:
             raise ValueError(f"Insufficient bank role({self.bankroll}), of player({self.id}), for shifting {amount} to stack.")
         else:
@@ -33,13 +43,20 @@ class Player:
 
     def bet(self, amount: Chips) -> Chips:
         "returns the net amount that a play adds to his current bet, all-in if insufficient"
-        net_amount = amount - self.current_bet
-        if net_amount >= self.stack:
-            net_amount = self.stack
+        return Chips(self.bet_to(int(amount)))
+
+    def bet_to(self, total: int) -> int:
+        "bet on plain ints: raises the current bet to total, returns the net amount, all-in if insufficient"
+        stack, current_bet = self.stack._amount, self.current_bet._amount
+        net_amount = total - current_bet
+        if net_amount < 0:
+            raise ValueError(f"Cannot bet less than the current bet. {self.id=}, {total=}, {current_bet=}")
+        if net_amount >= stack:
+            net_amount = stack
             self.all_in = True
-            # raise ValueError(f"Cannot bet more than the stack. {self.id=}, {self.stack=}, {net_amount=}")
-        self.stack -= net_amount
-        self.current_bet += net_amount
+        # in place, like the -= and += of Chips
+        self.stack._amount = stack - net_amount
+        self.current_bet._amount = current_bet + net_amount
         return net_amount
 
 
@@ -0,0 +1,63 @@
+from typing import NamedTuple, Sequence
+from . import Chips
+
+class Pot(NamedTuple):
+    amount: int
+    eligible: int # bit mask of the seats that can win the pot
+
+    def seats(self) -> list[int]:
+        return [seat for seat in range(self.eligible.bit_length()) if self.eligible >> seat & 1]
+
+class PotLedger():
+    "Chips put in by every seat during a round as plain ints, main and side pots are derived from them"
+    "Chips objects only appear at the boundary, see from_chips and chips"
+    __slots__ = ("contributed", "total")
+
+    def __init__(self, seats: int) -> None:
+        self.contributed: list[int] = [0]*seats
+        self.total: int = 0
+
+    @classmethod
+    def from_chips(cls, contributed: Sequence[Chips]) -> PotLedger:
+        ledger = cls(len(contributed))
+        for seat, chips in enumerate(contributed):
+            ledger.add(seat, int(chips))
+        return ledger
+
+    def add(self, seat: int, amount: int) -> None:
+        self.contributed[seat] += amount
+        self.total += amount
+
+    def clear(self) -> None:
+        self.contributed = [0]*len(self.contributed)
+        self.total = 0
+
+    def pots(self, folded: Sequence[bool]) -> list[Pot]:
+        """main pot first, then the side pots. One sort: every distinct contribution of a live seat closes a
+        pot that all seats fill up to that level, eligible are the live seats that reached it. Chips of folded
+        seats above the highest live contribution are dead money of the last pot."""
+        contributed = self.contributed
+        n = len(contributed)
+        order = sorted(range(n), key=contributed.__getitem__)
+        # live[k]: mask of the live seats in order[k:]
+        live = [0]*(n + 1)
+        for k in range(n - 1, -1, -1):
+            seat = order[k]
+            live[k] = live[k + 1] | (0 if folded[seat] else 1 << seat)
+        pots: list[Pot] = []
+        previous = pending = 0
+        for k, seat in enumerate(order):
+            level = contributed[seat]
+            if folded[seat] or level == previous:
+                pending += level - previous
+                continue
+            pots.append(Pot(pending + (level - previous)*(n - k), live[k]))
+            previous, pending = level, 0
+        if pending:
+            if not pots:
+                raise ValueError("Every seat has folded, nobody can win the pot.")
+            pots[-1] = Pot(pots[-1].amount + pending, pots[-1].eligible)
+        return pots
+
+    def chips(self, folded: Sequence[bool]) -> list[Chips]:
+        return [Chips(pot.amount) for pot in self.pots(folded)]
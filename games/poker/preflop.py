@@ -0,0 +1,200 @@
+import argparse
+import os
+import random
+import struct
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Optional
+from . import Card, Table
+from .equity import chunk_seed
+from .evaluator import showdown_strengths, split_key
+
+# Preflop all-in equity of the 169 starting hand classes against 1..MAX_OPPONENTS random hands.
+#
+# File layout (little endian):
+#   header  : magic b"PFEQ", version u16, classes u16, max_opponents u16, samples u32, seed u64
+#   values  : classes*max_opponents u16, equity*EQUITY_SCALE, MISSING for cells not computed yet
+# Every cell is sampled with its own seed derived from (seed, class, opponents) so a build is
+# deterministic, can be resumed from a partial file and any cell can be re-derived to verify it.
+
+MAGIC = b"PFEQ"
+VERSION = 1
+CLASSES = 169
+MAX_OPPONENTS = Table._SIZE_LIMIT - 1
+EQUITY_SCALE = 65534
+MISSING = 0xFFFF
+_HEADER = struct.Struct("<4sHHHIQ")
+_RANK_NAMES = "23456789TJQKA"
+
+def hand_class(card1: Card, card2: Card) -> int:
+    """0..168 index of the starting hand on a 13x13 grid of rank indices (Two is 0):
+    pairs on the diagonal, suited hands at [high][low], offsuit hands at [low][high]"""
+    high, low = sorted((card1.rank - 2, card2.rank - 2), reverse=True)
+    if card1.suit == card2.suit:
+        return high*13 + low
+    return low*13 + high
+
+def class_name(index: int) -> str:
+    row, col = divmod(index, 13)
+    if row == col:
+        return _RANK_NAMES[row]*2
+    if row > col:
+        return _RANK_NAMES[row] + _RANK_NAMES[col] + "s"
+    return _RANK_NAMES[col] + _RANK_NAMES[row] + "o"
+
+def class_cards(index: int) -> tuple[Card, Card]:
+    "one representative pair of cards of a hand class"
+    row, col = divmod(index, 13)
+    return Card.from_index(row), Card.from_index(col + (0 if row > col else 13))
+
+def cell_equity(index: int, opponents: int, samples: int, seed: int) -> float:
+    "Monte Carlo equity of a hand class against `opponents` random hands"
+    rng = random.Random(chunk_seed(seed, index*(MAX_OPPONENTS + 1) + opponents))
+    hole = [card.index for card in class_cards(index)]
+    hero = split_key(hole)
+    stub = [c for c in range(52) if c not in hole]
+    drawn_count = 5 + 2*opponents
+    total = 0.0
+    for _ in range(samples):
+        drawn = rng.sample(stub, drawn_count)
+        board_key, board_bits = split_key(drawn[:5])
+        holes = [hero] + [split_key(drawn[i:i + 2]) for i in range(5, drawn_count, 2)]
+        strengths = showdown_strengths(board_key, board_bits, holes)
+        if strengths[0] == (best := max(strengths)):
+            total += 1/strengths.count(best)
+    return total/samples
+
+def _cell(args: tuple[int, int, int, int]) -> tuple[int, int, int]:
+    index, opponents, samples, seed = args
+    return index, opponents, round(cell_equity(index, opponents, samples, seed)*EQUITY_SCALE)
+
+class PreflopTable():
+    "Equity lookup of two hole cards against 1..max_opponents random opponents"
+    def __init__(self, samples: int, seed: int, max_opponents: int = MAX_OPPONENTS,
+                 values: Optional[array] = None) -> None:
+        self.samples: int = samples
+        self.seed: int = seed
+        self.max_opponents: int = max_opponents
+        self.values: array = values if values is not None else array("H", [MISSING]*(CLASSES*max_opponents))
+
+    def equity(self, card1: Card, card2: Card, opponents: int = 1) -> float:
+        if not 1 <= opponents <= self.max_opponents:
+            raise ValueError(f"opponents must be in 1..{self.max_opponents}, not {opponents=}.")
+        value = self.values[hand_class(card1, card2)*self.max_opponents + opponents - 1]
+        if value == MISSING:
+            raise KeyError(f"{class_name(hand_class(card1, card2))} vs {opponents} is not computed yet.")
+        return value/EQUITY_SCALE
+
+    def missing(self) -> list[tuple[int, int]]:
+        "(class, opponents) cells not computed yet"
+        return [(i // self.max_opponents, i % self.max_opponents + 1) for i, v in enumerate(self.values) if v == MISSING]
+
+    def to_bytes(self) -> bytes:
+        values = array("H", self.values)
+        if sys.byteorder == "big":
+            values.byteswap()
+        return _HEADER.pack(MAGIC, VERSION, CLASSES, self.max_opponents, self.samples, self.seed) + values.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> PreflopTable:
+        magic, version, classes, max_opponents, samples, seed = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not a preflop equity table.")
+        if version != VERSION or classes != CLASSES:
+            raise ValueError(f"Unsupported preflop table {version=}, {classes=}.")
+        values = array("H")
+        values.frombytes(data[_HEADER.size:_HEADER.size + 2*classes*max_opponents])
+        if sys.byteorder == "big":
+            values.byteswap()
+        if len(values) != classes*max_opponents:
+            raise ValueError("Truncated preflop equity table.")
+        return cls(samples, seed, max_opponents, values)
+
+    @classmethod
+    def load(cls, path: str) -> PreflopTable:
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+    def save(self, path: str) -> None:
+        "atomic write, an interrupted save leaves the previous file in place"
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(self.to_bytes())
+        os.replace(tmp, path)
+
+def build(path: str, samples: int = 20_000, seed: int = 0, workers: int = 1,
+          checkpoint_every: int = 50, cells: Optional[Iterable[tuple[int, int]]] = None) -> PreflopTable:
+    """Computes every missing cell of the table at path (creating it if needed) and saves it.
+    Progress is saved every `checkpoint_every` cells, rerunning after an interruption resumes."""
+    if os.path.exists(path):
+        table = PreflopTable.load(path)
+        if (table.samples, table.seed) != (samples, seed):
+            raise ValueError(f"{path} was built with samples={table.samples}, seed={table.seed}.")
+    else:
+        table = PreflopTable(samples, seed)
+    todo = [(index, opponents, samples, seed)
+            for index, opponents in (cells if cells is not None else table.missing())]
+    done = 0
+    def store(result: tuple[int, int, int]) -> None:
+        nonlocal done
+        index, opponents, value = result
+        table.values[index*table.max_opponents + opponents - 1] = value
+        done += 1
+        if done % checkpoint_every == 0:
+            table.save(path)
+    if workers <= 1:
+        for args in todo:
+            store(_cell(args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for result in pool.map(_cell, todo, chunksize=4):
+                store(result)
+    table.save(path)
+    return table
+
+def verify(path: str, cells: int = 20, seed: int = 0, workers: int = 1) -> list[tuple[int, int]]:
+    "recomputes a random subset of cells, returns the (class, opponents) cells that differ"
+    table = PreflopTable.load(path)
+    rng = random.Random(seed)
+    computed = [i for i, v in enumerate(table.values) if v != MISSING]
+    picked = rng.sample(computed, min(cells, len(computed)))
+    todo = [(i // table.max_opponents, i % table.max_opponents + 1, table.samples, table.seed) for i in picked]
+    if workers <= 1:
+        results = list(map(_cell, todo))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_cell, todo))
+    return [(index, opponents) for index, opponents, value in results
+            if table.values[index*table.max_opponents + opponents - 1] != value]
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Preflop equity tables for the 169 starting hand classes")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_build = sub.add_parser("build", help="build or resume a table")
+    p_build.add_argument("path")
+    p_build.add_argument("--samples", type=int, default=20_000)
+    p_build.add_argument("--seed", type=int, default=0)
+    p_build.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    p_verify = sub.add_parser("verify", help="recompute random cells and compare")
+    p_verify.add_argument("path")
+    p_verify.add_argument("--cells", type=int, default=20)
+    p_verify.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    p_show = sub.add_parser("show", help="print the table")
+    p_show.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        build(args.path, args.samples, args.seed, args.workers)
+    elif args.command == "verify":
+        if (bad := verify(args.path, args.cells, workers=args.workers)):
+            raise SystemExit(f"{len(bad)} cells differ: {[(class_name(i), n) for i, n in bad]}")
+        print("ok")
+    else:
+        table = PreflopTable.load(args.path)
+        for index in range(CLASSES):
+            row = table.values[index*table.max_opponents:(index + 1)*table.max_opponents]
+            print(f"{class_name(index):>4} " + " ".join("  ----" if v == MISSING else f"{v/EQUITY_SCALE:.4f}" for v in row))
+
+if __name__ == "__main__":
+    main()
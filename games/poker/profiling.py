@@ -0,0 +1,178 @@
+import inspect
+import json
+import threading
+import time
+from typing import Callable
+from . import CardPile, Deck52, Round, HandRankfunc
+from .evaluator import HandState
+
+# Opt-in instrumentation. The first enabled Profiler wraps the methods listed in _TARGETS on their classes,
+# the last one disabled puts the originals back, so nothing is paid while profiling is off. The wrappers are
+# shared: every call is recorded by each Profiler enabled at the time, nested or concurrent Profilers do not
+# unpatch under each other. The classes are process wide, so a Profiler also sees the calls of other
+# threads and tasks while it is enabled.
+# Timed phases keep a histogram of wall times in power of two nanosecond buckets, counted ones only a call
+# counter (they are too small to time).
+# Phases nest: round.hand contains round.deal, round.betting, round.settlement, ...
+# A generator phase (resume_betting) counts only the time spent inside the generator, not the waits for actions.
+
+_TARGETS: list[tuple[type, str, str, bool]] = [ # (class, method, phase, timed)
+    (Deck52, "__init__", "deck.build", True),
+    (CardPile, "shuffle", "pile.shuffle", True),
+    (CardPile, "dealCard", "pile.deal_card", False),
+    (CardPile, "deal_many", "pile.deal_many", False),
+    (CardPile, "deal_round_robin", "pile.deal_round_robin", False),
+    (Round, "__init__", "round.init", True),
+    (Round, "dealCards", "round.deal", True),
+    (Round, "resume_betting", "round.betting", True),
+    (Round, "showdown", "round.settlement", True),
+    (Round, "play", "round.hand", True),
+    (HandRankfunc, "rank_of_hand", "handrank.rank_of_hand", True),
+    (HandRankfunc, "strength_of_hand", "handrank.strength_of_hand", True),
+    (HandRankfunc, "rank_hands", "handrank.rank_hands", True),
+    (HandState, "strength", "evaluator.hand_strength", False),
+]
+_BUCKETS = 64
+_ACTIVE: list[Profiler] = []
+_INSTALLED: list[tuple[type, str, object]] = [] # (class, method, original)
+_LOCK = threading.Lock()
+
+class Profiler():
+    def __init__(self) -> None:
+        self.counters: dict[str, int] = {}
+        self.totals: dict[str, int] = {}
+        self.histograms: dict[str, list[int]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self in _ACTIVE
+
+    def reset(self) -> None:
+        self.counters.clear()
+        self.totals.clear()
+        self.histograms.clear()
+
+    def record(self, phase: str, ns: int) -> None:
+        if phase not in self.histograms:
+            self.histograms[phase] = [0]*_BUCKETS
+            self.totals[phase] = 0
+            self.counters[phase] = 0
+        self.histograms[phase][min(ns.bit_length(), _BUCKETS - 1)] += 1
+        self.totals[phase] += ns
+        self.counters[phase] += 1
+
+    def enable(self) -> None:
+        with _LOCK:
+            if self in _ACTIVE:
+                return
+            if not _INSTALLED:
+                _install()
+            _ACTIVE.append(self)
+
+    def disable(self) -> None:
+        with _LOCK:
+            if self not in _ACTIVE:
+                return
+            _ACTIVE.remove(self)
+            if not _ACTIVE:
+                _uninstall()
+
+    def snapshot(self) -> dict[str, dict]:
+        """{"phases": {phase: count, total/mean ns, approximate p50/p99 ns and the non empty buckets keyed
+        by their upper bound in ns}, "counters": {phase: calls}} for every phase seen since the last reset"""
+        phases = {}
+        for phase, buckets in self.histograms.items():
+            count = self.counters[phase]
+            phases[phase] = {
+                "count": count,
+                "total_ns": self.totals[phase],
+                "mean_ns": self.totals[phase] / count,
+                "p50_ns": _quantile(buckets, count, 0.5),
+                "p99_ns": _quantile(buckets, count, 0.99),
+                "buckets": {str(1 << i): n for i, n in enumerate(buckets) if n},
+            }
+        return {"phases": phases, "counters": dict(self.counters)}
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot())
+
+    def __enter__(self) -> Profiler:
+        self.enable()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.disable()
+
+def _record(phase: str, ns: int) -> None:
+    for profiler in _ACTIVE:
+        profiler.record(phase, ns)
+
+def _count(phase: str) -> None:
+    for profiler in _ACTIVE:
+        profiler.counters[phase] = profiler.counters.get(phase, 0) + 1
+
+def _wrap(func: Callable, phase: str, timed: bool) -> Callable:
+    clock = time.perf_counter_ns
+    if timed and inspect.isgeneratorfunction(func):
+        def wrapper(*args, **kwargs):
+            elapsed, start = 0, clock()
+            steps = func(*args, **kwargs)
+            try:
+                value = next(steps)
+                while True:
+                    elapsed += clock() - start
+                    sent = yield value
+                    start = clock()
+                    value = steps.send(sent)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                _record(phase, elapsed + clock() - start)
+    elif timed:
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _record(phase, clock() - start)
+    else:
+        def wrapper(*args, **kwargs):
+            _count(phase)
+            return func(*args, **kwargs)
+    wrapper.__name__, wrapper.__doc__, wrapper.__wrapped__ = func.__name__, func.__doc__, func # type: ignore
+    return wrapper
+
+def _install() -> None:
+    for owner, name, phase, timed in _TARGETS:
+        original = owner.__dict__[name]
+        if isinstance(original, (staticmethod, classmethod)):
+            patched = type(original)(_wrap(original.__func__, phase, timed))
+        else:
+            patched = _wrap(original, phase, timed)
+        _INSTALLED.append((owner, name, original))
+        setattr(owner, name, patched)
+
+def _uninstall() -> None:
+    for owner, name, original in reversed(_INSTALLED):
+        setattr(owner, name, original)
+    _INSTALLED.clear()
+
+def _quantile(buckets: list[int], count: int, q: float) -> int:
+    "upper bound of the bucket holding the q quantile"
+    seen = 0
+    for i, n in enumerate(buckets):
+        seen += n
+        if seen >= q*count:
+            return 1 << i
+    return 1 << (_BUCKETS - 1)
+
+PROFILER = Profiler()
+
+def enable() -> None:
+    PROFILER.enable()
+
+def disable() -> None:
+    PROFILER.disable()
+
+def snapshot() -> dict[str, dict]:
+    return PROFILER.snapshot()
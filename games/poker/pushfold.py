@@ -0,0 +1,278 @@
+import argparse
+import os
+import random
+import struct
+import sys
+from array import array
+from functools import lru_cache
+from typing import NamedTuple, Optional, TYPE_CHECKING
+from core.rng import derive_seed
+from . import Card, Chips, Table
+from .agent import Action, ActionType, CALL, FOLD, Observation
+from .preflop import CLASSES, hand_class
+if TYPE_CHECKING:
+    import numpy as np
+
+# Heads-up push/fold equilibrium. The small blind (the dealer heads-up) goes all-in or folds, the big blind
+# calls or folds. Depths and antes are in big blinds, the stake of each player is the effective stack.
+#
+#   small blind folds            -(0.5 + ante)
+#   push, big blind folds        +(1 + ante)
+#   push, call                   equity*2*depth - depth        (zero sum, the big blind gets the opposite)
+#
+# Both sides are 169 class strategies (probability to push / to call), EVs come from a class x class
+# equity matrix weighted by the number of combo pairs without a shared card, so card removal is exact.
+# Fictitious play: each iteration is a best response to the other side's average strategy, which
+# converges to the equilibrium. It stops once the two best responses together gain less than `tolerance`.
+#
+# The equities are Monte Carlo estimates, not an enumeration, so the charts are estimates too: each class
+# pair is sampled `samples` times, a standard error of at most 0.5/sqrt(samples) equity (1.6% at the default
+# SAMPLES, 0.35% at 20,000). Hands close to indifference can come out on the wrong side of a push or call
+# threshold; everywhere else the chart is the exact equilibrium of the sampled matrix.
+# Building the matrix takes about 10s at the default SAMPLES. Like the preflop tables it can be built once
+# and saved to a versioned file (python -m games.poker.pushfold --matrix path --samples 20000), later runs
+# load it instead of sampling. A chart then takes milliseconds and is cached per (depth, ante, samples, path).
+#
+# File layout (little endian):
+#   header  : magic b"PFHM", version u16, classes u16, samples u32, seed u64
+#   equity  : classes*classes u16, equity*EQUITY_SCALE (the combo pair weights are exact and derived on load)
+
+DEPTHS: tuple[float, ...] = tuple(d/2 for d in range(2, 61)) # 1 to 30 big blinds in half big blinds
+SAMPLES = 1000
+MAGIC = b"PFHM"
+VERSION = 1
+EQUITY_SCALE = 65534
+_HEADER = struct.Struct("<4sHHIQ")
+
+class HandMatrix(NamedTuple):
+    equity: np.ndarray  # [i, j] all-in equity of class i against class j
+    weights: np.ndarray # [i, j] combo pairs of class i and class j without a shared card
+    samples: int
+    seed: int
+
+class Chart(NamedTuple):
+    depth: float
+    ante: float
+    push: tuple[float, ...] # by hand class, probability of the small blind pushing
+    call: tuple[float, ...] # by hand class, probability of the big blind calling a push
+    value: float            # the small blind's EV in big blinds per hand
+    exploitability: float   # what both best responses together would gain, in big blinds per hand
+    iterations: int
+
+    def pushes(self, card1: Card, card2: Card) -> float:
+        return self.push[hand_class(card1, card2)]
+
+    def calls(self, card1: Card, card2: Card) -> float:
+        return self.call[hand_class(card1, card2)]
+
+def _class_combos() -> list[list[tuple[int, int]]]:
+    "every two card combo of each class as Card.index pairs"
+    resp: list[list[tuple[int, int]]] = [[] for _ in range(CLASSES)]
+    for a in range(52):
+        for b in range(a):
+            resp[hand_class(Card.from_index(a), Card.from_index(b))].append((a, b))
+    return resp
+
+def _repeats(rows: np.ndarray) -> np.ndarray:
+    "rows holding a value twice"
+    resp = rows[:, 0] == rows[:, 1]
+    for a in range(rows.shape[1]):
+        for b in range(max(a + 1, 2), rows.shape[1]):
+            resp |= rows[:, a] == rows[:, b]
+    return resp
+
+def _combo_pairs() -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    "(cards, class of each combo, disjoint combo pairs, weights)"
+    import numpy as np
+    combos = _class_combos()
+    cards = np.array([combo for group in combos for combo in group], dtype=np.int64)
+    classes = np.repeat(np.arange(CLASSES), [len(group) for group in combos])
+    masks = (np.int64(1) << cards[:, 0]) | (np.int64(1) << cards[:, 1])
+    disjoint = (masks[:, None] & masks[None, :]) == 0
+    weights = np.zeros((CLASSES, CLASSES))
+    np.add.at(weights, (classes[:, None], classes[None, :]), disjoint)
+    return cards, classes, disjoint, weights
+
+@lru_cache(maxsize=4)
+def hand_matrix(samples: int = SAMPLES, seed: int = 0, path: Optional[str] = None) -> HandMatrix:
+    """Equity of every class against every other from `samples` random (combo, combo, board) deals per class
+    pair, the combo pair drawn in proportion to the pairs that can be held together. Cached, read-only.
+    With a path the matrix is loaded from that file, or sampled and saved there when it does not exist yet."""
+    if path is not None and os.path.exists(path):
+        matrix = load_matrix(path)
+        if (matrix.samples, matrix.seed) != (samples, seed):
+            raise ValueError(f"{path} was built with samples={matrix.samples}, seed={matrix.seed}.")
+        return matrix
+    import numpy as np
+    from .batch import evaluate_batch
+    cards, classes, disjoint, weights = _combo_pairs()
+    # the combo pairs of every class pair i < j, grouped by pair
+    first, second = np.nonzero(disjoint & (classes[:, None] < classes[None, :]))
+    pair = classes[first]*CLASSES + classes[second]
+    order = np.argsort(pair, kind="stable")
+    first, second, pair = first[order], second[order], pair[order]
+    pairs, offsets, counts = np.unique(pair, return_index=True, return_counts=True)
+    rng = np.random.default_rng(derive_seed(seed, "pushfold"))
+    wins = np.zeros(len(pairs))
+    chunk = max(1, 400_000 // samples)
+    for start in range(0, len(pairs), chunk):
+        stop = min(start + chunk, len(pairs))
+        k = np.repeat(np.arange(start, stop), samples)
+        picked = offsets[k] + (rng.random(len(k))*counts[k]).astype(np.int64)
+        holes = np.concatenate([cards[first[picked]], cards[second[picked]]], axis=1)
+        # 5 distinct board cards out of the 48 others: distinct values in 0..47, shifted past the hole cards
+        board = rng.integers(0, 48, (len(k), 5))
+        redo = np.arange(len(k))
+        while redo.size:
+            rows = board[redo]
+            redo = redo[_repeats(rows)]
+            board[redo] = rng.integers(0, 48, (len(redo), 5))
+        for dead in np.sort(holes, axis=1).T:
+            board += board >= dead[:, None]
+        hero = evaluate_batch(np.concatenate([holes[:, :2], board], axis=1))[0]
+        villain = evaluate_batch(np.concatenate([holes[:, 2:], board], axis=1))[0]
+        wins[start:stop] = ((hero > villain) + 0.5*(hero == villain)).reshape(-1, samples).mean(axis=1)
+    equity = np.full((CLASSES, CLASSES), 0.5)
+    i, j = np.divmod(pairs, CLASSES)
+    equity[i, j], equity[j, i] = wins, 1 - wins
+    # stored as the file holds it, so a sampled and a loaded matrix give the same charts
+    equity = np.round(equity*EQUITY_SCALE) / EQUITY_SCALE
+    equity.setflags(write=False)
+    weights.setflags(write=False)
+    matrix = HandMatrix(equity, weights, samples, seed)
+    if path is not None:
+        save_matrix(matrix, path)
+    return matrix
+
+def save_matrix(matrix: HandMatrix, path: str) -> None:
+    "atomic write, an interrupted save leaves the previous file in place"
+    values = array("H", (round(float(e)*EQUITY_SCALE) for e in matrix.equity.flat))
+    if sys.byteorder == "big":
+        values.byteswap()
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, CLASSES, matrix.samples, matrix.seed) + values.tobytes())
+    os.replace(tmp, path)
+
+def load_matrix(path: str) -> HandMatrix:
+    import numpy as np
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, classes, samples, seed = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a push/fold equity matrix.")
+    if version != VERSION or classes != CLASSES:
+        raise ValueError(f"Unsupported push/fold matrix {version=}, {classes=}.")
+    values = array("H")
+    values.frombytes(data[_HEADER.size:_HEADER.size + 2*classes*classes])
+    if sys.byteorder == "big":
+        values.byteswap()
+    if len(values) != classes*classes:
+        raise ValueError(f"Truncated push/fold matrix {path}.")
+    equity = np.array(values, dtype=float).reshape(classes, classes) / EQUITY_SCALE
+    weights = _combo_pairs()[3]
+    equity.setflags(write=False)
+    weights.setflags(write=False)
+    return HandMatrix(equity, weights, samples, seed)
+
+def solve(depth: float, ante: float = 0.0, matrix: Optional[HandMatrix] = None, tolerance: float = 1e-3,
+          max_iterations: int = 20_000) -> Chart:
+    "push/fold equilibrium at `depth` big blinds effective with `ante` big blinds from each player"
+    import numpy as np
+    if depth < 1:
+        raise ValueError(f"The effective stack must cover the big blind, got {depth=}.")
+    if ante < 0:
+        raise ValueError(f"Ante must be non negative, got {ante=}.")
+    equity, weights = (matrix if matrix is not None else hand_matrix())[:2]
+    frequency = weights.sum(axis=1) / weights.sum()
+    fold_value = -(0.5 + ante)
+    # showdown result of the small blind, and the big blind's gain from calling rather than folding
+    showdown = 2*depth*equity - depth
+    call_gain = (1 + ante - showdown) * weights
+    # a push wins the blind and ante unless called, a call swaps them for the showdown
+    call_loss = (1 + ante - showdown) * weights / weights.sum(axis=1, keepdims=True)
+    def push_values(call: np.ndarray) -> np.ndarray:
+        return (1 + ante) - call_loss @ call
+    def value(push: np.ndarray, call: np.ndarray) -> float:
+        return float(frequency @ (push*push_values(call) + (1 - push)*fold_value))
+    push, call = np.ones(CLASSES), np.ones(CLASSES)
+    iteration, exploitability = 0, float("inf")
+    while iteration < max_iterations:
+        iteration += 1
+        best_push = (push_values(call) > fold_value).astype(float)
+        best_call = ((push @ call_gain) > 0).astype(float)
+        push += (best_push - push) / (iteration + 1)
+        call += (best_call - call) / (iteration + 1)
+        if iteration % 50 == 0:
+            best_push = (push_values(call) > fold_value).astype(float)
+            best_call = ((push @ call_gain) > 0).astype(float)
+            exploitability = value(best_push, call) - value(push, best_call)
+            if exploitability < tolerance:
+                break
+    return Chart(depth, ante, tuple(push.tolist()), tuple(call.tolist()), value(push, call), exploitability, iteration)
+
+@lru_cache(maxsize=None)
+def chart(depth: float, ante: float = 0.0, samples: int = SAMPLES, path: Optional[str] = None) -> Chart:
+    "the cached chart of a (depth, ante), solved on first use, on the matrix of hand_matrix(samples, path=path)"
+    return solve(depth, ante, hand_matrix(samples, path=path))
+
+def nearest_depth(stack: Chips, table: Table) -> float:
+    "the DEPTHS entry closest to a stack in big blinds of the table"
+    return min(max(round(stack.amount / int(table.blind_amount)) / 2, DEPTHS[0]), DEPTHS[-1])
+
+def table_chart(table: Table, ante: Optional[Chips] = None, samples: int = SAMPLES, path: Optional[str] = None) -> Chart:
+    """chart of the table's blinds and effective stack, the smaller stack of the two active players
+    counting what they have bet in the current round"""
+    ante = ante if ante else Chips(0)
+    stacks = [int(player.stack) + int(player.current_bet) for player in table.players if player.active]
+    if len(stacks) != 2:
+        raise ValueError(f"Push/fold charts are heads-up, the table has {len(stacks)} active players.")
+    return chart(nearest_depth(Chips(min(stacks)), table), ante.amount / (2*int(table.blind_amount)), samples, path)
+
+class PushFoldAgent():
+    "plays the equilibrium chart of the effective stack, mixed strategies are sampled with rng"
+    def __init__(self, table: Table, ante: Optional[Chips] = None, rng: Optional[random.Random] = None,
+                 samples: int = SAMPLES, path: Optional[str] = None) -> None:
+        self.table: Table = table
+        self.ante: Optional[Chips] = ante
+        self.rng: random.Random = rng if rng else random.Random()
+        self.samples: int = samples
+        self.path: Optional[str] = path
+
+    def act(self, observation: Observation) -> Action:
+        if observation.street or not observation.to_call:
+            return CALL
+        strategy = table_chart(self.table, self.ante, self.samples, self.path)
+        hand = hand_class(*(Card.from_index(card) for card in observation.hand))
+        if observation.current_bet < 2*int(self.table.blind_amount): # the small blind, first to act
+            if self.rng.random() < strategy.push[hand]:
+                return Action(ActionType.RAISE, observation.current_bet + observation.stack)
+            return FOLD
+        return CALL if self.rng.random() < strategy.call[hand] else FOLD
+
+def grid(strategy: tuple[float, ...]) -> str:
+    "13x13 grid of a strategy, aces top left, suited hands above the diagonal"
+    return "\n".join(" ".join(f"{strategy[row*13 + col]:4.2f}" for col in range(12, -1, -1)) for row in range(12, -1, -1))
+
+def combo_count(index: int) -> int:
+    row, col = divmod(index, 13)
+    return 6 if row == col else 4 if row > col else 12
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Heads-up push/fold equilibrium charts")
+    parser.add_argument("depths", nargs="*", type=float, help="effective stacks in big blinds, all of DEPTHS by default")
+    parser.add_argument("--ante", type=float, default=0.0, help="ante in big blinds")
+    parser.add_argument("--samples", type=int, default=SAMPLES, help="runouts per class pair of the equity matrix")
+    parser.add_argument("--matrix", help="equity matrix file, built and saved there when it does not exist")
+    args = parser.parse_args(argv)
+
+    for depth in args.depths or DEPTHS:
+        result = chart(depth, args.ante, args.samples, args.matrix)
+        pushed = sum(p*combo_count(i) for i, p in enumerate(result.push))
+        print(f"{depth:5.1f}bb  push {pushed/1326:6.1%}  value {result.value:+.4f}bb  "
+              f"exploitability {result.exploitability:.4f}bb  {result.iterations} iterations")
+        if args.depths:
+            print("push\n" + grid(result.push) + "\ncall\n" + grid(result.call))
+
+if __name__ == "__main__":
+    main()
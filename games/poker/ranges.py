@@ -0,0 +1,183 @@
+import random
+from functools import lru_cache
+from itertools import combinations
+from math import comb
+from typing import Iterable, NamedTuple, Optional, TYPE_CHECKING
+from . import Card
+if TYPE_CHECKING:
+    import numpy as np
+
+# Hand ranges in the usual notation, comma separated tokens with an optional ":weight" (default 1):
+#   QQ  QQ+  QQ-88          pairs, that pair / and every higher pair / the pairs between
+#   AKs AKo AK              suited / offsuit / both
+#   ATs+  A5s-A2s           kicker up to one below the high card / kicker range with the same high card
+#   AsKh                    one combo, suits s h c d
+# A combo is a pair of Card.index, higher index first. A later token overrides the weight of an earlier one.
+
+_RANKS = "23456789TJQKA"
+_SUITS = "shcd"
+
+Combo = tuple[Card, Card]
+
+def _rank(char: str, token: str) -> int:
+    r = _RANKS.find(char.upper())
+    if r < 0:
+        raise ValueError(f"Unknown rank {char!r} in range token {token!r}.")
+    return r
+
+def _pair(r: int) -> list[tuple[int, int]]:
+    return [(13*s1 + r, 13*s2 + r) for s1, s2 in combinations(range(4), 2)]
+
+def _two_ranks(high: int, low: int, kind: str) -> list[tuple[int, int]]:
+    resp = []
+    for s1 in range(4):
+        for s2 in range(4):
+            if kind == "s" and s1 != s2 or kind == "o" and s1 == s2:
+                continue
+            resp.append((13*s1 + high, 13*s2 + low))
+    return resp
+
+def _parse_token(token: str) -> list[tuple[int, int]]:
+    if len(token) == 4 and token[1] in _SUITS and token[3] in _SUITS:
+        a, b = 13*_SUITS.index(token[1]) + _rank(token[0], token), 13*_SUITS.index(token[3]) + _rank(token[2], token)
+        if a == b:
+            raise ValueError(f"Range token {token!r} uses the same card twice.")
+        return [(a, b)]
+    hand, _, end = token.partition("-")
+    plus = hand.endswith("+")
+    hand = hand.rstrip("+")
+    if len(hand) not in (2, 3) or len(hand) == 3 and hand[2] not in "so":
+        raise ValueError(f"Cannot parse range token {token!r}.")
+    high, low, kind = _rank(hand[0], token), _rank(hand[1], token), hand[2:]
+    if high == low:
+        if kind:
+            raise ValueError(f"A pair cannot be suited or offsuit, {token!r}.")
+        if end:
+            other = _rank(end[0], token)
+            if len(end) != 2 or end[1] != end[0]:
+                raise ValueError(f"Cannot parse range token {token!r}.")
+            ranks = range(min(high, other), max(high, other) + 1)
+        else:
+            ranks = range(high, 13) if plus else range(high, high + 1)
+        return [combo for r in ranks for combo in _pair(r)]
+    if low > high:
+        high, low = low, high
+    if end:
+        if end[:1].upper() != _RANKS[high] or end[2:] != kind or len(end) != len(hand):
+            raise ValueError(f"A range {token!r} must keep the high card and the kind.")
+        other = _rank(end[1], token)
+        lows = range(min(low, other), max(low, other) + 1)
+    else:
+        lows = range(low, high) if plus else range(low, low + 1)
+    return [combo for l in lows for combo in _two_ranks(high, l, kind)]
+
+def parse_range(text: str) -> dict[tuple[int, int], float]:
+    "every combo of the range (higher Card.index first) with its weight"
+    resp: dict[tuple[int, int], float] = {}
+    for token in text.replace(" ", "").split(","):
+        if not token:
+            continue
+        token, _, weight = token.partition(":")
+        value = float(weight) if weight else 1.0
+        if not 0 <= value <= 1:
+            raise ValueError(f"Weight of {token!r} must be in 0..1, got {value}.")
+        for a, b in _parse_token(token):
+            resp[max(a, b), min(a, b)] = value
+    return resp
+
+def _board_indices(board: Optional[Iterable[Card]]) -> tuple[int, ...]:
+    return tuple(sorted(card.index for card in board)) if board is not None else ()
+
+def _weighted(text: str, board: tuple[int, ...]) -> list[tuple[tuple[int, int], float]]:
+    "combos with a positive weight that do not use a board card, in canonical (sorted) order"
+    return sorted((combo, weight) for combo, weight in parse_range(text).items()
+                  if weight > 0 and combo[0] not in board and combo[1] not in board)
+
+def combos(text: str, board: Optional[Iterable[Card]] = None) -> list[tuple[Card, Card, float]]:
+    "the range as Card pairs with weights, without the combos that need a card of the board"
+    return [(Card.from_index(a), Card.from_index(b), weight) for (a, b), weight in _weighted(text, _board_indices(board))]
+
+class RangeEquity(NamedTuple):
+    hero: list[Combo]
+    villain: list[Combo]
+    hero_weights: np.ndarray
+    villain_weights: np.ndarray
+    matrix: np.ndarray # hero combo x villain combo equity, NaN where they share a card
+
+    def equity(self) -> float:
+        "equity of the hero range against the villain range, every pair of combos weighted by both weights"
+        import numpy as np
+        valid = ~np.isnan(self.matrix)
+        weights = self.hero_weights[:, None] * self.villain_weights[None, :] * valid
+        total = weights.sum()
+        if not total:
+            raise ValueError("The ranges have no combos that can be held together.")
+        return float((np.where(valid, self.matrix, 0) * weights).sum() / total)
+
+@lru_cache(maxsize=128)
+def _equity_matrix(hero: tuple[tuple[int, int], ...], villain: tuple[tuple[int, int], ...], board: tuple[int, ...],
+                   samples: int, seed: int) -> np.ndarray:
+    import numpy as np
+    from .batch import evaluate_batch
+    n, m = len(hero), len(villain)
+    missing = 5 - len(board)
+    stub = [c for c in range(52) if c not in board]
+    if comb(len(stub), missing) <= samples:
+        runouts = list(combinations(stub, missing))
+    else:
+        rng = random.Random(seed)
+        runouts = [rng.sample(stub, missing) for _ in range(samples)]
+    hands = np.array(hero + villain, dtype=np.int8).reshape(n + m, 2)
+    hand_masks = (np.int64(1) << hands[:, 0].astype(np.int64)) | (np.int64(1) << hands[:, 1].astype(np.int64))
+    runout_cards = np.array(runouts, dtype=np.int8).reshape(len(runouts), missing)
+    runout_masks = np.zeros(len(runouts), dtype=np.int64)
+    for k in range(missing):
+        runout_masks |= np.int64(1) << runout_cards[:, k].astype(np.int64)
+    board_cards = np.array(board, dtype=np.int8)
+    wins = np.zeros((n, m))
+    counts = np.zeros((n, m))
+    chunk = max(1, 2_000_000 // max(1, n*m))
+    for start in range(0, len(runouts), chunk):
+        cards, masks = runout_cards[start:start + chunk], runout_masks[start:start + chunk]
+        c = len(cards)
+        rows = np.concatenate([
+            np.broadcast_to(board_cards, (c, n + m, len(board))),
+            np.broadcast_to(cards[:, None, :], (c, n + m, missing)),
+            np.broadcast_to(hands, (c, n + m, 2)),
+        ], axis=2).reshape(c*(n + m), 7)
+        # a hand that holds a card of the runout is not evaluated, its cells are left out of the counts
+        live = (masks[:, None] & hand_masks[None, :]) == 0
+        strengths = np.zeros(c*(n + m), dtype=np.int32)
+        strengths[live.reshape(-1)] = evaluate_batch(rows[live.reshape(-1)])[0]
+        strengths = strengths.reshape(c, n + m)
+        ok = live[:, :n, None] & live[:, None, n:]
+        h, v = strengths[:, :n, None], strengths[:, None, n:]
+        wins += (((h > v) + 0.5*(h == v)) * ok).sum(axis=0)
+        counts += ok.sum(axis=0)
+    disjoint = (hand_masks[:n, None] & hand_masks[None, n:]) == 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        matrix = np.where(disjoint & (counts > 0), wins / counts, np.nan)
+    matrix.setflags(write=False) # shared by every caller through the cache
+    return matrix
+
+def range_equity(hero: str, villain: str, board: Optional[Iterable[Card]] = None, samples: int = 2000,
+                 seed: int = 0) -> RangeEquity:
+    """Per combo equity of every hero combo against every villain combo. Runouts are enumerated when there
+    are at most `samples` of them (flop, turn, river), otherwise `samples` runouts are drawn with the seed.
+    Matrices are cached by (canonical hero and villain combos, board, samples, seed), weights do not matter."""
+    import numpy as np
+    cards = _board_indices(board)
+    if len(cards) > 5 or len(set(cards)) != len(cards):
+        raise ValueError(f"A board has at most 5 different cards, got {len(cards)}.")
+    hero_combos, villain_combos = _weighted(hero, cards), _weighted(villain, cards)
+    if not hero_combos or not villain_combos:
+        raise ValueError("Both ranges need at least one combo that does not use a board card.")
+    matrix = _equity_matrix(tuple(combo for combo, _ in hero_combos), tuple(combo for combo, _ in villain_combos),
+                            cards, samples, seed)
+    return RangeEquity(
+        hero=[(Card.from_index(a), Card.from_index(b)) for (a, b), _ in hero_combos],
+        villain=[(Card.from_index(a), Card.from_index(b)) for (a, b), _ in villain_combos],
+        hero_weights=np.array([weight for _, weight in hero_combos]),
+        villain_weights=np.array([weight for _, weight in villain_combos]),
+        matrix=matrix,
+    )
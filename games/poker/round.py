@@ -1,21 +1,53 @@
-from . import Table, CardPile, Deck52, Chips, Player
+from typing import Generator, Optional, TYPE_CHECKING
+from core.rng import ShuffleRNG
+from . import Table, CardPile, Deck52, Chips, Player, ID
+from .agent import Agent, ConsoleAgent, Action, ActionType, Observation
+from .evaluator import HandState
+from .settlement import FOLDED, settle
+from .pots import PotLedger
+if TYPE_CHECKING:
+    from .history import HistoryWriter
 
 class Round:
-    def __init__(self, table: Table):
+    def __init__(self, table: Table, agents: Optional[dict[ID, Agent]] = None, rng: Optional[ShuffleRNG] = None,
+                 deck: Optional[CardPile] = None, history: Optional[HistoryWriter] = None):
+        "deck is dealt from the top as given instead of a shuffled Deck52, history gets the round once it is played"
         # round-table linking
         self.table = table
         self.id = table.round_count + 1
         # fixed start of a round
-        self.deck: CardPile = Deck52(f"Start deck of round {self.id}")
-        self.deck.shuffle()
+        if deck is None:
+            deck = Deck52(f"Start deck of round {self.id}")
+            # only the dealt cards get shuffled, same cards as a full shuffle
+            deck.shuffle(rng, lazy=True)
+        self.deck: CardPile = deck
         self.players = self.get_active_players()
         if len(self.players) < 2:
             raise ValueError(f"not enought active players on the table to play poker")
+        self.history: Optional[HistoryWriter] = history
+        self.start_stacks: list[int] = [int(player.stack) for player in self.players]
+        # (seat, street, ActionType, current bet after the action) of every decision, as applied
+        self.actions: list[tuple[int, int, ActionType, int]] = []
+        self.won: dict[ID, Chips] = {}
+        self.agents: dict[ID, Agent] = agents if agents is not None else {player.id: ConsoleAgent(player.id) for player in self.players}
         self.dealCards()
         self.community_cards = CardPile([], f"Community cards for round({self.id})")
+        # Card.index views handed to the agents, kept in step by dealCards and the street openings
+        self.hole_indices: list[tuple[int, ...]] = [tuple(card.index for card in player.hand) for player in self.players]
+        self.board_indices: tuple[int, ...] = ()
+        # every seat's hole cards plus the board so far, a dealt community card is added in O(1)
+        self.hand_states: list[HandState] = [HandState(hole) for hole in self.hole_indices]
         self.burns = CardPile([], f"Burn cards for round({self.id})")
-        self.pots= [Chips(0)]
-        self.call_amount: Chips = Chips(0)
+        self.seats: dict[ID, int] = {player.id: seat for seat, player in enumerate(self.players)}
+        self.ledger = PotLedger(len(self.players))
+        self.last_call: Chips = Chips(0)
+        self.min_raise_size: Chips = 2*self.table.blind_amount
+        self.street = 0
+        # betting in progress: seats still owing a decision and the seat asked next, empty between streets
+        self.pending: list[bool] = []
+        self.to_act: int = 0
+        self.started: bool = False
+        self.finished: bool = False
 
 
     @property
@@ -28,13 +60,34 @@ class Round:
     def big_blind(self):
         return self.players[2%len(self.players)]
     @property
-    def current_pot(self):
-        return self.pots[-1]
-    @current_pot.setter
-    def current_pot(self, value: Chips):
-        self.pots[-1] = value
+    def pots(self) -> list[Chips]:
+        "main and side pots if the round ended now"
+        return self.ledger.chips([player.folded for player in self.players])
 
 
+    def clone(self, agents: Optional[dict[ID, Agent]] = None) -> Round:
+        """an independent copy for search: cloned table and players, copied piles, ledger and betting state.
+        The agents are shared unless given, the clone writes no history."""
+        resp = Round.__new__(Round)
+        resp.__dict__.update(self.__dict__)
+        resp.table = self.table.clone()
+        resp.players = [resp.table.player_map[player.id] for player in self.players]
+        resp.deck = self.deck.copy()
+        resp.community_cards = self.community_cards.copy()
+        resp.burns = self.burns.copy()
+        resp.hand_states = [state.copy() for state in self.hand_states]
+        resp.ledger = PotLedger(len(self.players))
+        resp.ledger.contributed, resp.ledger.total = self.ledger.contributed.copy(), self.ledger.total
+        resp.last_call = Chips(int(self.last_call))
+        resp.min_raise_size = Chips(int(self.min_raise_size))
+        resp.pending = self.pending.copy()
+        resp.actions = self.actions.copy()
+        resp.won = dict(self.won)
+        resp.history = None
+        if agents is not None:
+            resp.agents = agents
+        return resp
+
     def get_active_players(self) -> list[Player]:
         active_players = []
         for player in self.table.players:
@@ -48,93 +101,216 @@ class Round:
                         player.active=False
                         continue
                 player.folded = False
+                player.all_in = False
+                player.current_bet = Chips(0)
                 player.hand = CardPile()
                 active_players.append(player)
         return active_players
-    
+
     def dealCards(self):
-        for _ in range(2):
-            for player in self.players:
-                self.deck.dealCard(player.hand, face_up=False)
-    
+        "two hole cards each, one at a time in seat order starting with the dealer (players[0])"
+        self.deck.deal_round_robin(2, [player.hand for player in self.players], face_up=False)
+
     def place_blinds(self):
-        blind = self.small_blind.bet(self.table.blind_amount)
-        b_blind = self.big_blind.bet(2*self.table.blind_amount)
-        self.current_pot = blind + b_blind
-        self.last_call = max(blind, b_blind)
-        
+        self.ledger.add(1, int(self.small_blind.bet(self.table.blind_amount)))
+        self.ledger.add(2 % len(self.players), int(self.big_blind.bet(2*self.table.blind_amount)))
+        # copies, the bets grow in place and must not drag last_call along
+        self.last_call = Chips(int(max(self.small_blind.current_bet, self.big_blind.current_bet)))
+
+    @staticmethod
+    def can_act(player: Player) -> bool:
+        return player.active and not (player.folded or player.all_in)
+
+    def players_in(self) -> int:
+        return sum(1 for player in self.players if not player.folded)
+
+    def to_call(self, player: Player) -> Chips:
+        if player.current_bet >= self.last_call:
+            return Chips(0)
+        return self.last_call - player.current_bet
+
+    def observe(self, player: Player, seat: Optional[int] = None, players_in: Optional[int] = None) -> Observation:
+        "the player's view, the hand strength is evaluated only if the agent reads it"
+        if seat is None:
+            seat = self.players.index(player)
+        if players_in is None:
+            players_in = self.players_in()
+        last_call, current_bet = self.last_call._amount, player.current_bet._amount
+        return Observation(seat, self.street, self.hole_indices[seat], self.board_indices, self.ledger.total,
+                           max(0, last_call - current_bet), current_bet, player.stack._amount,
+                           last_call + self.min_raise_size._amount, players_in, -1, self.hand_states[seat])
 
     def betting_round(self, start: int=0):
-        half_bets: set[Chips] = set() 
-        for player in cyclic(self.players, start):
-            if player.all_in or player.folded or (not player.active):
-                continue
-            elif self.last_call == player.current_bet:
-                break
-            else:
-                while True:
-                    play = input(f"{player.id=} fold(f), call(c) {self.call_amount}, raise(r <amount>)")
-                    if play == 'f':
-                        self.fold(player)
-                    else:
-                        if play == 'c':
-                            bet = self.call(player)
-                        elif play[0] == 'r':
-                            amount = Chips(int(play.split()[-1]))
-                            if amount < self.last_call:
-                                print("Wrong amount...it should be more than call")
-                                continue
-                            bet = self.raise_bet(player, amount)
-                        else:
-                            print("Wrong Input)")
-                            continue
-                        if bet != self.last_call:
-                            # need to make a side pot
-                            half_bets.add(bet)
-                    break
-        if half_bets:
-            reduce: list[Chips] = list(half_bets)
-            reduce.sort()
-            for r in reduce:
-                side_pot = Chips(0)
-                for player in self.players:
-                    if player.folded or (not player.active) or player.current_bet==0:
-                        continue
-                    player.current_bet -= r
-                    side_pot += r
-                    if player.current_bet == 0:
-                        player.last_pot_index = len(self.pots)
-                self.pots.append(side_pot)
-                    
-    
+        "asks the agents in turn from seat `start` until every player still able to act has matched the last raise"
+        self.drive(self.betting_steps(start))
+
+    def betting_steps(self, start: int=0) -> Generator[tuple[int, Observation], Action, None]:
+        """betting_round as a generator: yields (seat, observation) for every decision and takes the Action
+        through send(), so the caller decides how actions are obtained (agents, a network, ...)"""
+        self.start_betting(start)
+        return self.resume_betting()
+
+    def start_betting(self, start: int=0) -> None:
+        "opens a street: every player able to act is pending, seat `start` acts first"
+        self.pending = [self.can_act(player) for player in self.players]
+        self.to_act = start % len(self.players)
+
+    def resume_betting(self) -> Generator[tuple[int, Observation], Action, None]:
+        """continues the street from pending and to_act, the whole betting state lives on the round so a
+        clone or a restored snapshot picks up at the same decision"""
+        players = self.players
+        n = len(players)
+        # one pass for the three counts, this runs on every street
+        waiting = actors = players_in = 0
+        for pending, player in zip(self.pending, players):
+            waiting += pending
+            if not player.folded:
+                players_in += 1
+                actors += player.active and not player.all_in
+        while waiting and players_in > 1:
+            i = self.to_act
+            if self.pending[i]:
+                player = players[i]
+                # the last player able to act with nothing to call has no decision to make
+                if actors > 1 or player.current_bet._amount < self.last_call._amount:
+                    raised = self.act(player, (yield i, self.observe(player, i, players_in)))
+                    self.actions.append((i, self.street, ActionType.RAISE if raised else ActionType.FOLD if player.folded
+                                         else ActionType.CALL, int(player.current_bet)))
+                    if player.folded:
+                        players_in -= 1
+                    if not self.can_act(player):
+                        actors -= 1
+                    if raised:
+                        self.pending = [j != i and self.can_act(q) for j, q in enumerate(players)]
+                        waiting = sum(self.pending) + 1
+                # cleared only now, a seat waiting for its action is still pending
+                self.pending[i] = False
+                waiting -= 1
+            self.to_act = (i + 1) % n
+        self.pending = []
+        self.collect_bets()
+
+    def act(self, player: Player, action: Action) -> bool:
+        "applies the action of the player, returns True if it raised the bet"
+        # on plain ints, the betting loop makes no Chips
+        kind = action.type
+        if kind == ActionType.FOLD:
+            player.folded = True
+            return False
+        previous = self.last_call._amount
+        if kind == ActionType.RAISE and player.stack._amount > previous - player.current_bet._amount:
+            total = max(action.amount, previous + self.min_raise_size._amount)
+            self.ledger.add(self.seats[player.id], player.bet_to(total))
+            current = player.current_bet._amount
+            if current > previous:
+                self.last_call = Chips(current)
+                self.min_raise_size = Chips(max(self.min_raise_size._amount, current - previous))
+                return True
+        elif player.current_bet._amount < previous:
+            self.ledger.add(self.seats[player.id], player.bet_to(previous))
+        return False
+
+    def collect_bets(self) -> None:
+        "ends a street, the bets are already in the ledger"
+        for player in self.players:
+            player.current_bet = Chips(0)
+        self.last_call = Chips(0)
+        self.min_raise_size = Chips(2*self.table.blind_amount._amount)
+
+
     def fold(self, player:Player):
         player.folded = True
-        player.current_bet = Chips(0)
     def call(self, player: Player):
-        bet = player.bet(self.last_call)
-        self.current_pot += bet
-        return bet
+        if int(player.current_bet) >= int(self.last_call): # a check moves no chips
+            return Chips(0)
+        bet = player.bet_to(int(self.last_call))
+        self.ledger.add(self.seats[player.id], bet)
+        return Chips(bet)
     def raise_bet(self, player: Player, amount: Chips):
-        bet = player.bet(amount)
-        self.current_pot += bet
-        self.last_call = max(self.last_call, bet)
-        return bet
+        bet = player.bet_to(int(amount))
+        self.ledger.add(self.seats[player.id], bet)
+        self.last_call = Chips(int(max(self.last_call, player.current_bet)))
+        return Chips(bet)
     def burn_card(self) -> None:
         self.deck.dealCard(self.burns, face_up=False)
     # community card openings
     def open_flop(self) -> None:
         self.burn_card()
-        for _ in range(3):
-            self.deck.dealCard(self.community_cards, face_up=True)
+        self.deck.deal_many(3, self.community_cards, face_up=True)
+        self.board_indices = tuple(card.index for card in self.community_cards)
+        for card in self.board_indices:
+            self.add_to_hands(card)
+        self.street = 1
     def open_turn(self):
         self.burn_card()
         self.deck.dealCard(self.community_cards, face_up=True)
+        self.board_indices += (self.community_cards[-1].index,)
+        self.add_to_hands(self.board_indices[-1])
+        self.street += 1
+    def add_to_hands(self, card: int) -> None:
+        for player, state in zip(self.players, self.hand_states):
+            if not player.folded:
+                state.add(card)
     open_river = open_turn
 
+    def showdown(self) -> dict[ID, Chips]:
+        "awards every pot to the best eligible hands, returns the chips won by each player"
+        players = self.players
+        folded = [player.folded for player in players]
+        # odd chips go to the winners closest to the left of the dealer
+        order = list(range(1, len(players))) + [0]
+        strengths = [FOLDED if out else state.strength() for out, state in zip(folded, self.hand_states)]
+        won = settle(strengths, self.ledger.pots(folded), order)
+        self.ledger.clear()
+        resp: dict[ID, Chips] = {}
+        for seat in order:
+            if won[seat]:
+                players[seat].stack += Chips(won[seat])
+                resp[players[seat].id] = Chips(won[seat])
+        return resp
+
+    def play(self) -> dict[ID, Chips]:
+        "plays the whole round from the blinds to the showdown, returns the chips won by each player"
+        return self.drive(self.play_steps())
+
+    def play_steps(self) -> Generator[tuple[int, Observation], Action, dict[ID, Chips]]:
+        """play as a generator of decisions like betting_steps, the chips won are its return value.
+        A round that was already started (a clone, a restored snapshot, a stopped replay) goes on from its state."""
+        if self.finished:
+            raise ValueError(f"Round {self.id} is over.")
+        if not self.started:
+            self.started = True
+            self.place_blinds()
+            # one generator less per decision than yield from betting_steps
+            self.start_betting(3)
+            yield from self.resume_betting()
+        elif self.pending:
+            yield from self.resume_betting()
+        while self.street < 3 and self.players_in() > 1:
+            (self.open_flop if self.street == 0 else self.open_turn)()
+            if sum(1 for player in self.players if self.can_act(player)) > 1:
+                self.start_betting(1)
+                yield from self.resume_betting()
+        won = self.won = self.showdown()
+        self.finished = True
+        self.table.finish_round()
+        if self.history is not None:
+            self.history.write(self)
+        return won
+
+    def drive(self, steps: Generator[tuple[int, Observation], Action, object]):
+        "runs a generator of decisions to the end with the round's agents, returns its return value"
+        try:
+            seat, observation = next(steps)
+            while True:
+                seat, observation = steps.send(self.agents[self.players[seat].id].act(observation))
+        except StopIteration as stop:
+            return stop.value
+
 
 
 # to be moved out
 
 import itertools
 def cyclic(lst, start=0):
-    return itertools.islice(itertools.cycle(lst), start, None)
\ No newline at end of file
+    return itertools.islice(itertools.cycle(lst), start, None)
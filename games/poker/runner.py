@@ -0,0 +1,87 @@
+import multiprocessing
+import queue as queue_module
+from typing import Callable, Iterator, NamedTuple, Optional
+from core.rng import derive_seed
+from . import Table, Round, ID
+from .agent import Agent
+from .simulator import Simulator
+
+# Runs many independent tables over a process pool.
+# Table t plays with Simulator seed derive_seed(master seed, t), so hand h of table t is fully determined
+# by (master seed, t, h) and the table factory, see replay_hand.
+
+TableFactory = Callable[[int], tuple[Table, dict[ID, Agent]]]
+
+class TableReport(NamedTuple):
+    table_id: int
+    first_hand: int           # number of the first hand covered by this report
+    hands: int                # hands covered by this report
+    deltas: dict[ID, int]     # chip change of every player over those hands
+    done: bool                # last report of the table
+    error: Optional[str] = None
+
+_queue = None
+
+def _init_worker(queue) -> None:
+    global _queue
+    _queue = queue
+
+def _play_table(factory: TableFactory, table_id: int, hands: int, seed: int, report_every: int) -> Iterator[TableReport]:
+    table, agents = factory(table_id)
+    sim = Simulator(table, agents, derive_seed(seed, table_id))
+    first, deltas = 0, {player.id: 0 for player in table.players}
+    while sim.hands_played < hands:
+        if (hand := sim.play_hand()) is None:
+            break
+        for id, delta in hand.items():
+            deltas[id] += delta
+        if sim.hands_played - first == report_every:
+            yield TableReport(table_id, first, sim.hands_played - first, deltas, False)
+            first, deltas = sim.hands_played, {player.id: 0 for player in table.players}
+    yield TableReport(table_id, first, sim.hands_played - first, deltas, True)
+
+def _run_table(args: tuple[TableFactory, int, int, int, int]) -> None:
+    table_id = args[1]
+    try:
+        for report in _play_table(*args):
+            _queue.put(report)
+    except Exception as e:
+        _queue.put(TableReport(table_id, 0, 0, {}, True, f"{type(e).__name__}: {e}"))
+
+def run_tables(factory: TableFactory, tables: int, hands: int, seed: int, workers: Optional[int] = None,
+               report_every: int = 1000) -> Iterator[TableReport]:
+    """Plays `hands` hands on each of `tables` tables built by factory(table_id) and yields a TableReport
+    every `report_every` hands of a table as soon as it arrives. factory must be picklable (a module level
+    function) when workers > 1. Reports of different tables interleave in completion order."""
+    if workers == 1:
+        for table_id in range(tables):
+            yield from _play_table(factory, table_id, hands, seed, report_every)
+        return
+    ctx = multiprocessing.get_context()
+    queue = ctx.Queue(maxsize=1024)
+    with ctx.Pool(workers, initializer=_init_worker, initargs=(queue,)) as pool:
+        result = pool.map_async(_run_table, [(factory, table_id, hands, seed, report_every) for table_id in range(tables)], chunksize=1)
+        finished = 0
+        while finished < tables:
+            try:
+                report = queue.get(timeout=1)
+            except queue_module.Empty:
+                if result.ready():
+                    result.get() # raises the worker failure, if any
+                    raise RuntimeError("Table workers exited without reporting.")
+                continue
+            if report.error:
+                raise RuntimeError(f"Table {report.table_id} failed: {report.error}")
+            finished += report.done
+            yield report
+
+def replay_hand(factory: TableFactory, seed: int, table_id: int, hand: int) -> Round:
+    """Replays hand number `hand` of table `table_id` bit for bit and returns its finished Round.
+    The table state (stacks, dealer) depends on the earlier hands, so they are replayed first."""
+    table, agents = factory(table_id)
+    sim = Simulator(table, agents, derive_seed(seed, table_id))
+    while sim.hands_played <= hand:
+        if sim.play_hand() is None:
+            raise ValueError(f"Table {table_id} stopped after {sim.hands_played} hands.")
+    assert sim.last_round is not None
+    return sim.last_round
@@ -0,0 +1,267 @@
+import argparse
+import asyncio
+import json
+import random
+from typing import Callable, Optional
+from core.rng import derive_seed
+from . import Chips, Player, Table, Round, ID
+from .agent import Action, ActionType, Observation
+
+# Many tables in one process on asyncio. Every message is one line of JSON, over TCP or a Unix socket.
+#
+#   client -> server   {"op": "sit",    "table": t, "player": id}
+#                      {"op": "leave",  "table": t, "player": id}
+#                      {"op": "action", "table": t, "player": id, "seq": n, "type": "fold"|"call"|"raise", "amount": x}
+#   server -> client   {"op": "seated", "table": t, "player": id}
+#                      {"op": "act",    "table": t, "player": id, "seq": n, "observation": {Observation fields}}
+#                      {"op": "result", "table": t, "hand": h, "won": {id: chips}, "board": [Card.index]}
+#                      {"op": "error",  "message": text}
+#
+# A connection can hold seats at any number of tables. A table plays while two or more of its seats are
+# taken, an idle table is only its Table object and a task waiting on an Event. Rounds are driven through
+# Round.play_steps, so waiting for one player never blocks another table. A player that does not answer
+# within action_timeout (or has left) checks when possible and folds otherwise.
+# Backpressure: writes wait for the socket to drain and at most max_active_hands hands are computed at a
+# time. Each seat holds one answer, a newer one replaces an answer not taken yet, so reading a connection
+# never waits on a table. Actions are checked when they are read, a bad one gets an error and never
+# reaches the round.
+
+ACTION_TYPES = {"fold": ActionType.FOLD, "call": ActionType.CALL, "raise": ActionType.RAISE}
+
+def parse_action(message: dict) -> Action:
+    "the Action of an action message, ValueError for an unknown type or an amount that is not a non negative int"
+    type, amount = message.get("type"), message.get("amount", 0)
+    if type not in ACTION_TYPES:
+        raise ValueError(f"Unknown action type {type!r}, expected one of {sorted(ACTION_TYPES)}.")
+    if isinstance(amount, bool) or not isinstance(amount, int) or amount < 0:
+        raise ValueError(f"Action amount must be a non negative integer, got {amount!r}.")
+    return Action(ACTION_TYPES[type], amount)
+
+def default_table(table_id: int, seats: int = 6) -> Table:
+    "seats S0.. with deep bankrolls, nobody sits until a client takes the seat"
+    players = [Player(f"S{i}", Chips(10**9)) for i in range(seats)]
+    for player in players:
+        player.auto_buyin_atmax = True
+    return Table(players, blind_amount=Chips(10))
+
+class Connection():
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.actions: dict[tuple[int, ID], asyncio.Queue] = {}
+
+    async def send(self, message: dict) -> bool:
+        "False when the client is gone"
+        try:
+            self.writer.write(json.dumps(message).encode() + b"\n")
+            await self.writer.drain()
+        except ConnectionError:
+            return False
+        return True
+
+class TableRuntime():
+    "one table: its seats, the connections sitting there and the task playing hands"
+    def __init__(self, server: GameServer, table_id: int, table: Table) -> None:
+        self.server = server
+        self.id: int = table_id
+        self.table: Table = table
+        for player in table.players:
+            player.active = False
+        self.seated: dict[ID, Connection] = {}
+        self.ready = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.rng = random.Random(derive_seed(server.seed, table_id))
+        self.hands: int = 0
+        self.playing: bool = False
+        self._seq: int = 0
+
+    def sit(self, id: ID, connection: Connection) -> None:
+        if id not in self.table.player_map:
+            raise ValueError(f"Table {self.id} has no seat {id!r}.")
+        if id in self.seated:
+            raise ValueError(f"Seat {id!r} of table {self.id} is taken.")
+        self.seated[id] = connection
+        connection.actions[self.id, id] = asyncio.Queue(maxsize=1)
+        self.table.player_map[id].active = True
+        if len(self.seated) >= 2:
+            self.ready.set()
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    def leave(self, id: ID, connection: Connection) -> None:
+        "the seat is freed now, the player is taken out of the table before the next hand"
+        if self.seated.get(id) is connection:
+            del self.seated[id]
+            connection.actions.pop((self.id, id), None)
+        if len(self.seated) < 2:
+            self.ready.clear()
+
+    async def run(self) -> None:
+        while not self.server.closing:
+            await self.ready.wait()
+            async with self.server.active_hands:
+                self.playing = True
+                try:
+                    await self.play_hand()
+                finally:
+                    self.playing = False
+            await asyncio.sleep(0) # let other tables and readers in between hands
+
+    async def play_hand(self) -> None:
+        for player in self.table.players:
+            if player.id not in self.seated:
+                player.active = False
+        try:
+            round = Round(self.table, {}, self.rng)
+        except ValueError:
+            self.ready.clear()
+            return
+        steps = round.play_steps()
+        try:
+            seat, observation = next(steps)
+            while True:
+                seat, observation = steps.send(await self.ask(round.players[seat].id, observation))
+        except StopIteration as stop:
+            won = stop.value
+        self.hands += 1
+        message = {"op": "result", "table": self.id, "hand": self.hands, "won": {id: int(chips) for id, chips in won.items()},
+                   "board": list(round.board_indices)}
+        for connection in set(self.seated.values()):
+            await connection.send(message)
+
+    async def ask(self, id: ID, observation: Observation) -> Action:
+        fallback = Action(ActionType.FOLD if observation.to_call else ActionType.CALL)
+        connection = self.seated.get(id)
+        if connection is None:
+            return fallback
+        self._seq += 1
+        seq = self._seq
+        queue = connection.actions[self.id, id]
+        if not await connection.send({"op": "act", "table": self.id, "player": id, "seq": seq, "observation": observation._asdict()}):
+            return fallback
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.server.action_timeout
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), max(0.0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                return fallback
+            if message is None: # the player left
+                return fallback
+            if message.get("seq") == seq: # anything else is a late answer to an earlier request
+                try:
+                    return parse_action(message)
+                except ValueError: # checked by dispatch already, a bad action must not end the table task
+                    return fallback
+
+class GameServer():
+    def __init__(self, tables: int, factory: Callable[[int], Table] = default_table, seed: int = 0,
+                 action_timeout: float = 10.0, max_active_hands: int = 256) -> None:
+        self.seed: int = seed
+        self.action_timeout: float = action_timeout
+        self.active_hands = asyncio.Semaphore(max_active_hands)
+        self.tables: dict[int, TableRuntime] = {table_id: TableRuntime(self, table_id, factory(table_id)) for table_id in range(tables)}
+        self.connections: set[Connection] = set()
+        self.closing: bool = False
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start_tcp(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        "starts listening, returns the port (a free one when port is 0)"
+        self._server = await asyncio.start_server(self.handle, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start_unix(self, path: str) -> None:
+        self._server = await asyncio.start_unix_server(self.handle, path)
+
+    async def close(self, grace: float = 5.0) -> None:
+        "hands in progress get up to `grace` seconds to finish, so no chips are left in a pot"
+        self.closing = True
+        tasks = [runtime.task for runtime in self.tables.values() if runtime.task is not None]
+        for runtime in self.tables.values():
+            if runtime.task is not None and not runtime.playing:
+                runtime.task.cancel()
+        if (playing := [task for task in tasks if not task.done()]):
+            await asyncio.wait(playing, timeout=grace)
+        for task in tasks:
+            task.cancel()
+        for connection in list(self.connections):
+            connection.writer.close()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        connection = Connection(reader, writer)
+        self.connections.add(connection)
+        try:
+            while (line := await reader.readline()):
+                try:
+                    message = json.loads(line)
+                    await self.dispatch(connection, message)
+                except (ValueError, KeyError, TypeError) as e:
+                    await connection.send({"op": "error", "message": str(e)})
+        except ConnectionError:
+            pass
+        finally:
+            self.connections.discard(connection)
+            for table_id, id in list(connection.actions):
+                self.leave(table_id, id, connection)
+            writer.close()
+
+    async def dispatch(self, connection: Connection, message: dict) -> None:
+        op, table_id, id = message["op"], message.get("table"), message.get("player")
+        if table_id not in self.tables:
+            raise ValueError(f"No table {table_id!r}.")
+        if op == "sit":
+            self.tables[table_id].sit(id, connection)
+            await connection.send({"op": "seated", "table": table_id, "player": id})
+        elif op == "leave":
+            self.leave(table_id, id, connection)
+        elif op == "action":
+            queue = connection.actions.get((table_id, id))
+            if queue is None:
+                raise ValueError(f"Not seated as {id!r} at table {table_id}.")
+            parse_action(message)
+            if queue.full(): # a stale answer nobody took, the newer one replaces it
+                queue.get_nowait()
+            queue.put_nowait(message)
+        else:
+            raise ValueError(f"Unknown op {op!r}.")
+
+    def leave(self, table_id: int, id: ID, connection: Connection) -> None:
+        queue = connection.actions.get((table_id, id))
+        self.tables[table_id].leave(id, connection)
+        if queue is not None:
+            while not queue.empty(): # a stale answer would keep a pending ask waiting for the timeout
+                queue.get_nowait()
+            queue.put_nowait(None) # wakes a pending ask
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Multi-table poker server, newline delimited JSON over TCP or a Unix socket")
+    parser.add_argument("--tables", type=int, default=1000)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="listen on this Unix socket path instead of TCP")
+    parser.add_argument("--timeout", type=float, default=10.0, help="seconds a player has for an action")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    async def serve() -> None:
+        server = GameServer(args.tables, seed=args.seed, action_timeout=args.timeout)
+        if args.unix:
+            await server.start_unix(args.unix)
+            print(f"{args.tables} tables on {args.unix}")
+        else:
+            port = await server.start_tcp(args.host, args.port)
+            print(f"{args.tables} tables on {args.host}:{port}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.close()
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
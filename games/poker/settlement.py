@@ -0,0 +1,31 @@
+from typing import Sequence
+from .pots import Pot
+
+# Showdown settlement on plain ints: one strength per seat, the pots of a PotLedger and the
+# order in which tied winners receive odd chips. Nothing is evaluated or sorted per pot.
+
+FOLDED = -1
+
+def settle(strengths: Sequence[int], pots: Sequence[Pot], order: Sequence[int]) -> list[int]:
+    """chips won by every seat. pots as built by PotLedger.pots, main pot first and each eligible set
+    inside the one before, order lists the seats from the first to receive an odd chip of a split pot.
+    The live seats are ranked once, the best eligible seat of a pot is never above the one of the pot before."""
+    priority = {seat: i for i, seat in enumerate(order)}
+    ranked = sorted((seat for seat in order if strengths[seat] != FOLDED), key=lambda seat: (-strengths[seat], priority[seat]))
+    won = [0]*len(strengths)
+    start = 0
+    for pot in pots:
+        eligible = pot.eligible
+        while not eligible >> ranked[start] & 1:
+            start += 1
+        best = strengths[ranked[start]]
+        winners = []
+        for seat in ranked[start:]:
+            if strengths[seat] != best:
+                break
+            if eligible >> seat & 1:
+                winners.append(seat)
+        share, odd = divmod(pot.amount, len(winners))
+        for i, seat in enumerate(winners):
+            won[seat] += share + (i < odd)
+    return won
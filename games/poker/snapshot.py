@@ -0,0 +1,194 @@
+import struct
+from collections import deque
+from typing import Callable, Optional
+from . import Card, CardPile, Chips, Player, Table, Round, ID
+from .agent import Agent, ActionType, ConsoleAgent
+from .evaluator import HandState
+from .pots import PotLedger
+
+# Checkpoints of a Table, or of a Round with its Table, as bytes. Fixed width little endian fields,
+# chips as u64, cards as their Card.index (u8), every pile as u8 count, cards, u64 face up mask over Card.index.
+#
+#   header    : magic b"PKS", version (u8), kind (u8, 0 table, 1 round)
+#   table     : blind, min buyin, max buyin, low chips (u64), size limit (u8), round count (u32), players n (u8)
+#   n times   : id length (u8), id utf-8, bankroll, stack, current bet (u64), flags (u8), hand pile if HAS_HAND
+#               (table order, the dealer of the next round first)
+#   round     : round id (u32), seats m (u8), m table positions (u8), street (u8), flags (u8), to act (u8),
+#               pending seats (u32 mask), last call, min raise (u64), m contributions, m start stacks (u64),
+#               deck, community cards and burn piles,
+#               actions count (u16) then per action seat (u8), street << 2 | ActionType (u8), bet after it (u64),
+#               winners count (u8) then per winner seat (u8), chips won (u64)
+#
+# Encode and decode are linear in the state. Hole and board indices, hand states and the seat map are
+# derived again on restore, a lazily shuffled deck is stored in the order it is going to deal.
+# A new layout gets a new VERSION and its own decoder in _DECODERS, the old decoders stay so older
+# checkpoints keep loading.
+
+MAGIC = b"PKS"
+VERSION = 1
+_TABLE, _ROUND = 0, 1
+# player flags
+ACTIVE, AUTO_BUYIN_ATMAX, AUTO_TOP_UP, FOLDED, ALL_IN, HAS_HAND = (1 << i for i in range(6))
+# round flags
+STARTED, FINISHED, BETTING = (1 << i for i in range(3))
+
+_HEADER = struct.Struct("<3sBB")
+_RULES = struct.Struct("<QQQQBIB")
+_PLAYER = struct.Struct("<QQQB")
+_ROUND_HEAD = struct.Struct("<IB")
+_ROUND_STATE = struct.Struct("<BBBIQQ")
+_ACTION = struct.Struct("<BBQ")
+_WON = struct.Struct("<BQ")
+_U8 = struct.Struct("<B")
+_U16 = struct.Struct("<H")
+_U64 = struct.Struct("<Q")
+
+def _put_pile(out: bytearray, pile: CardPile) -> None:
+    cards = [card.index for card in pile]
+    out += _U8.pack(len(cards))
+    out += bytes(cards)
+    out += _U64.pack(pile._face_up)
+
+def _get_pile(data: bytes, pos: int, comment: str = "") -> tuple[CardPile, int]:
+    n = data[pos]
+    pile = CardPile([Card.from_index(index) for index in data[pos + 1:pos + 1 + n]], comment)
+    pos += 1 + n
+    pile._face_up = _U64.unpack_from(data, pos)[0]
+    return pile, pos + 8
+
+def _put_table(out: bytearray, table: Table) -> None:
+    out += _RULES.pack(int(table.blind_amount), int(table.min_buyin), int(table.max_buyin), int(table.low_chips_amount),
+                       table.size_limit, table.round_count, len(table.players))
+    for player in table.players:
+        name = player.id.encode()
+        has_hand = hasattr(player, "hand")
+        flags = (player.active*ACTIVE | player.auto_buyin_atmax*AUTO_BUYIN_ATMAX | player.auto_top_up*AUTO_TOP_UP
+                 | player.folded*FOLDED | player.all_in*ALL_IN | has_hand*HAS_HAND)
+        out += _U8.pack(len(name))
+        out += name
+        out += _PLAYER.pack(int(player.bankroll), int(player.stack), int(player.current_bet), flags)
+        if has_hand:
+            _put_pile(out, player.hand)
+
+def _get_table(data: bytes, pos: int) -> tuple[Table, int]:
+    blind, min_buyin, max_buyin, low_chips, size_limit, round_count, n = _RULES.unpack_from(data, pos)
+    pos += _RULES.size
+    players = []
+    for _ in range(n):
+        length = data[pos]
+        player = Player(data[pos + 1:pos + 1 + length].decode(), Chips(0))
+        pos += 1 + length
+        bankroll, stack, current_bet, flags = _PLAYER.unpack_from(data, pos)
+        pos += _PLAYER.size
+        player.bankroll, player.stack, player.current_bet = Chips(bankroll), Chips(stack), Chips(current_bet)
+        player.active, player.auto_buyin_atmax = bool(flags & ACTIVE), bool(flags & AUTO_BUYIN_ATMAX)
+        player.auto_top_up, player.folded, player.all_in = bool(flags & AUTO_TOP_UP), bool(flags & FOLDED), bool(flags & ALL_IN)
+        if flags & HAS_HAND:
+            player.hand, pos = _get_pile(data, pos)
+        players.append(player)
+    # the rules are set directly, the constructor would move chips between bankrolls and stacks
+    table = Table.__new__(Table)
+    table.size_limit, table.blind_amount, table.low_chips_amount = size_limit, Chips(blind), Chips(low_chips)
+    table.min_buyin, table.max_buyin = Chips(min_buyin), Chips(max_buyin)
+    table.players = deque(players)
+    table.player_map = {player.id: player for player in players}
+    table.round_count = round_count
+    return table, pos
+
+def snapshot_table(table: Table) -> bytes:
+    out = bytearray(_HEADER.pack(MAGIC, VERSION, _TABLE))
+    _put_table(out, table)
+    return bytes(out)
+
+def snapshot(round: Round) -> bytes:
+    "the round and its table"
+    out = bytearray(_HEADER.pack(MAGIC, VERSION, _ROUND))
+    table = round.table
+    _put_table(out, table)
+    positions = {player.id: position for position, player in enumerate(table.players)}
+    out += _ROUND_HEAD.pack(round.id, len(round.players))
+    out += bytes(positions[player.id] for player in round.players)
+    flags = round.started*STARTED | round.finished*FINISHED | bool(round.pending)*BETTING
+    pending = sum(1 << seat for seat, waiting in enumerate(round.pending) if waiting)
+    out += _ROUND_STATE.pack(round.street, flags, round.to_act, pending, int(round.last_call), int(round.min_raise_size))
+    out += struct.pack(f"<{2*len(round.players)}Q", *round.ledger.contributed, *round.start_stacks)
+    # a copy settles a lazy shuffle without touching the live deck
+    _put_pile(out, round.deck.copy() if round.deck._unshuffled else round.deck)
+    _put_pile(out, round.community_cards)
+    _put_pile(out, round.burns)
+    out += _U16.pack(len(round.actions))
+    for seat, street, type, amount in round.actions:
+        out += _ACTION.pack(seat, street << 2 | type, amount)
+    out += _U8.pack(len(round.won))
+    for id, chips in round.won.items():
+        out += _WON.pack(round.seats[id], int(chips))
+    return bytes(out)
+
+def _header(data: bytes, kind: int) -> Callable[[bytes, int], object]:
+    if len(data) < _HEADER.size or data[:3] != MAGIC:
+        raise ValueError(f"Not a poker snapshot, starts with {bytes(data[:3])!r}.")
+    _, version, found = _HEADER.unpack_from(data, 0)
+    if version not in _DECODERS:
+        raise ValueError(f"Unsupported snapshot version {version}, this build reads {sorted(_DECODERS)}.")
+    if found != kind:
+        raise ValueError(f"Snapshot holds a {('table', 'round')[found]}, not a {('table', 'round')[kind]}.")
+    return _DECODERS[version][kind]
+
+def restore_table(data: bytes) -> Table:
+    return _header(data, _TABLE)(data, _HEADER.size) # type: ignore
+
+def restore(data: bytes, agents: Optional[dict[ID, Agent]] = None) -> Round:
+    """a live Round with a new Table, it plays on with play() or play_steps(). agents default to
+    ConsoleAgents like a new Round, no history is written"""
+    round: Round = _header(data, _ROUND)(data, _HEADER.size) # type: ignore
+    round.agents = agents if agents is not None else {player.id: ConsoleAgent(player.id) for player in round.players}
+    return round
+
+def _decode_table_v1(data: bytes, pos: int) -> Table:
+    return _get_table(data, pos)[0]
+
+def _decode_round_v1(data: bytes, pos: int) -> Round:
+    table, pos = _get_table(data, pos)
+    round = Round.__new__(Round)
+    round.table = table
+    round.id, m = _ROUND_HEAD.unpack_from(data, pos)
+    pos += _ROUND_HEAD.size
+    round.players = [table.players[position] for position in data[pos:pos + m]]
+    pos += m
+    round.street, flags, round.to_act, pending, last_call, min_raise = _ROUND_STATE.unpack_from(data, pos)
+    pos += _ROUND_STATE.size
+    round.started, round.finished = bool(flags & STARTED), bool(flags & FINISHED)
+    round.pending = [bool(pending >> seat & 1) for seat in range(m)] if flags & BETTING else []
+    round.last_call, round.min_raise_size = Chips(last_call), Chips(min_raise)
+    amounts = struct.unpack_from(f"<{2*m}Q", data, pos)
+    pos += 16*m
+    round.ledger = PotLedger(m)
+    for seat, amount in enumerate(amounts[:m]):
+        round.ledger.add(seat, amount)
+    round.start_stacks = list(amounts[m:])
+    round.deck, pos = _get_pile(data, pos, f"Start deck of round {round.id}")
+    round.community_cards, pos = _get_pile(data, pos, f"Community cards for round({round.id})")
+    round.burns, pos = _get_pile(data, pos, f"Burn cards for round({round.id})")
+    count = _U16.unpack_from(data, pos)[0]
+    pos += 2
+    round.actions = []
+    for _ in range(count):
+        seat, kind, amount = _ACTION.unpack_from(data, pos)
+        round.actions.append((seat, kind >> 2, ActionType(kind & 3), amount))
+        pos += _ACTION.size
+    round.won = {}
+    for _ in range(data[pos]):
+        seat, chips = _WON.unpack_from(data, pos + 1 + _WON.size*len(round.won))
+        round.won[round.players[seat].id] = Chips(chips)
+    # derived state
+    round.history = None
+    round.seats = {player.id: seat for seat, player in enumerate(round.players)}
+    round.hole_indices = [tuple(card.index for card in player.hand) for player in round.players]
+    round.board_indices = tuple(card.index for card in round.community_cards)
+    round.hand_states = [HandState(hole + round.board_indices) for hole in round.hole_indices]
+    return round
+
+# version -> (table decoder, round decoder), each takes the data and the position after the header
+_DECODERS: dict[int, tuple[Callable[[bytes, int], Table], Callable[[bytes, int], Round]]] = {
+    1: (_decode_table_v1, _decode_round_v1),
+}
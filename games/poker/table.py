@@ -39,4 +39,17 @@ class Table():
         # self.current_rount
     def init_active_player_stack_forced(self):
         for player in self.players:
-            player.make_stack_of(min(self.max_buyin, player.bankroll))
\ No newline at end of file
+            player.make_stack_of(min(self.max_buyin, player.bankroll))
+
+    def clone(self) -> Table:
+        "the same rules with cloned players in the same seats"
+        resp = Table.__new__(Table)
+        resp.__dict__.update(self.__dict__)
+        resp.players = deque(player.clone() for player in self.players)
+        resp.player_map = {player.id: player for player in resp.players}
+        return resp
+
+    def finish_round(self) -> None:
+        "counts the round and moves the dealer button to the next player"
+        self.round_count += 1
+        self.players.rotate(-1)
\ No newline at end of file
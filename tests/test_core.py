@@ -0,0 +1,133 @@
+from core import Card, CardMask, CardPile, Deck52, Rank, Suit
+
+def test_card_index_round_trip():
+    indices = [card.index for card in Deck52()]
+    assert sorted(indices) == list(range(52))
+    for card in Deck52():
+        assert Card.from_index(card.index) == card
+
+def test_card_mask():
+    pile = CardPile([Card(Suit.HEARTS, Rank.Ace), Card(Suit.HEARTS, Rank.Two), Card(Suit.CLUBS, Rank.Ace)])
+    mask = CardMask.from_pile(pile)
+    assert len(mask) == 3
+    assert Card(Suit.HEARTS, Rank.Two) in mask and Card(Suit.SPADES, Rank.Two) not in mask
+    assert mask.suit_ranks(Suit.HEARTS) == 1 << 12 | 1
+    assert mask.rank_mask() == 1 << 12 | 1
+    assert set(mask.to_pile()) == set(pile)
+    other = CardMask.from_cards([Card(Suit.CLUBS, Rank.Ace), Card(Suit.DIAMONDS, Rank.King)])
+    assert len(mask | other) == 4 and len(mask & other) == 1 and len(mask - other) == 2
+    assert len(~mask) == 49 and (~mask).isdisjoint(mask)
+    import pytest
+    with pytest.raises(TypeError):
+        {mask: 1}
+    key = int(mask)
+    mask.add(Card(Suit.SPADES, Rank.Two))
+    assert int(mask) != key and len(mask) == 4
+
+def test_cards_are_interned_and_face_state_is_per_pile():
+    import pytest
+    card = Card(Suit.SPADES, Rank.Ace)
+    assert card is Card(Suit.SPADES, Rank.Ace) is Card.from_index(card.index)
+    with pytest.raises(AttributeError):
+        card.rank = Rank.Two
+    deck, other = Deck52(), Deck52()
+    assert deck[-1] is other[-1]
+    table, burns = CardPile(), CardPile()
+    deck.dealCard(table, face_up=True)
+    deck.dealCard(burns)
+    assert str(table) == str(table[0]) and str(burns) == "##"
+    burns.flip_open()
+    table.flipCards_inplace()
+    assert str(table) == "##" and str(burns) == str(burns[0])
+    assert len(deck) == 50 and len(other) == 52 and list(other) == list(Deck52()) # dealing left the other deck alone
+
+def test_lazy_shuffle_deals_like_a_full_shuffle():
+    import random
+    eager, lazy = Deck52(), Deck52(rng=random.Random(7))
+    eager.shuffle(random.Random(7))
+    lazy.shuffle(lazy=True)
+    hand = CardPile()
+    for _ in range(9):
+        lazy.dealCard(hand)
+    assert list(hand) == eager[:-10:-1]
+    assert list(lazy) == eager[:-9] # the rest settles into the same order
+
+def test_permutation_batch():
+    import pytest
+    pytest.importorskip("numpy")
+    from core.rng import PermutationBatch
+    a, b = PermutationBatch(3, batch=8), PermutationBatch(3, batch=8)
+    perms = [a.permutation() for _ in range(20)]
+    assert perms == [b.permutation() for _ in range(20)]
+    assert all(sorted(perm) == list(range(52)) for perm in perms) and len({tuple(p) for p in perms}) == 20
+    deck = Deck52(rng=PermutationBatch(3))
+    deck.shuffle(lazy=True)
+    assert sorted(card.index for card in deck) == list(range(52))
+
+def test_indexed_pile_counts_follow_every_change():
+    import random
+    deck, pile = Deck52(rng=random.Random(2)), CardPile(indexed=True)
+    deck.build_index()
+    deck.shuffle(lazy=True)
+    def check(p):
+        plain = CardPile(list(p))
+        assert p.rank_counts() == plain.rank_counts() and p.suit_counts() == plain.suit_counts()
+        for rank in Rank:
+            assert p.rank_count(rank) == plain.rank_count(rank)
+            assert sorted(p.get_cards_with_rank(rank), key=hash) == sorted(plain.get_cards_with_rank(rank), key=hash)
+        for suit in Suit:
+            assert p.suit_count(suit) == plain.suit_count(suit)
+            assert sorted(p.get_cards_with_suit(suit), key=hash) == sorted(plain.get_cards_with_suit(suit), key=hash)
+        assert all((card in p) == (card in plain) for card in Deck52())
+    for _ in range(12):
+        deck.dealCard(pile)
+    pile.addCards([deck[0], deck[1]])
+    pile += deck[2]
+    pile += CardPile([deck[3]])
+    pile.insertCard(0, deck[4])
+    pile[1] = deck[5]
+    pile[2:4] = [deck[6]]
+    del pile[0]
+    del pile[-2:]
+    aces = pile.seperate_cards_by_rank(pile[0].rank)
+    assert aces and all(card.rank == aces[0].rank for card in aces) and pile.rank_count(aces[0].rank) == 0
+    check(pile), check(deck), check(pile + deck[7]), check(pile.copy())
+
+def test_bulk_deals_match_single_deals_and_views_copy_nothing():
+    import random
+    import pytest
+    from core import PileView
+    for lazy in (False, True):
+        single, bulk = Deck52(rng=random.Random(5)), Deck52(rng=random.Random(5))
+        bulk.build_index()
+        single.shuffle(lazy=lazy), bulk.shuffle(lazy=lazy)
+        hands, bulk_hands = [CardPile() for _ in range(4)], [CardPile() for _ in range(4)]
+        for _ in range(2):
+            for hand in hands:
+                single.dealCard(hand)
+        bulk.deal_round_robin(2, bulk_hands)
+        board, bulk_board = CardPile(), CardPile()
+        for _ in range(3):
+            single.dealCard(board, face_up=True)
+        bulk.deal_many(3, bulk_board, face_up=True)
+        assert [list(hand) for hand in hands] == [list(hand) for hand in bulk_hands]
+        assert list(board) == list(bulk_board) and str(board) == str(bulk_board)
+        assert list(single) == list(bulk) and bulk.rank_counts() == CardPile(list(bulk)).rank_counts()
+    with pytest.raises(ValueError):
+        bulk.deal_many(len(bulk) + 1, board)
+    shown, bulk_shown = Deck52(), Deck52()
+    for pile in (shown, bulk_shown):
+        for card in pile[::3]:
+            pile.set_face_up(card)
+    singles, bulks = [CardPile() for _ in range(3)], [CardPile() for _ in range(3)]
+    for _ in range(4):
+        for pile in singles:
+            shown.dealCard(pile, face_up=None)
+    bulk_shown.deal_round_robin(4, bulks, face_up=None)
+    assert [str(pile) for pile in singles] == [str(pile) for pile in bulks] and str(shown) == str(bulk_shown)
+    view = bulk_board.view(bulk_hands[0])
+    assert isinstance(view, PileView) and list(view) == list(bulk_board + bulk_hands[0]) and len(view) == 5
+    assert view[3] is bulk_hands[0][0] and view[-1] is bulk_hands[0][-1] and view[1:3] == bulk_board[1:3]
+    assert bulk_hands[0][0] in view and view.is_face_up(bulk_board[0]) and not view.is_face_up(view[4])
+    bulk.deal_many(1, bulk_board)
+    assert len(view) == 6 and view.to_pile().rank_counts() == view.rank_counts()
@@ -1,4 +1,5 @@
 from games.poker import *
+from games.poker.evaluator import evaluate_mask
 def test_rank_hands():
         t = Table([
                 (p1 := Player("A", Chips(1000))),
@@ -20,3 +21,472 @@ def test_rank_hands():
                 p_map[p].hand.flip_open()
                 print(f"{p}: {h[0].name}, {p_map[p].hand} -> {" ".join(str(card) for card in h[1])}")
 
+
+def cards(text: str) -> CardPile:
+        "CardPile from text like 'As Kh 5d', suits s h c d"
+        suits = dict(s=Suit.SPADES, h=Suit.HEARTS, c=Suit.CLUBS, d=Suit.DIAMONDS)
+        ranks = {rank.short_name: rank for rank in Rank}
+        return CardPile([Card(suits[t[1]], ranks[t[0]]) for t in text.split()])
+
+def test_evaluator_ordering():
+        ladder = [
+                "2s 3h 5d 8c 9s Jh Kd",   # high card
+                "2s 2h 5d 8c 9s Jh Kd",   # one pair
+                "2s 2h 5d 5c 9s Jh Kd",   # two pair
+                "2s 2h 2d 8c 9s Jh Kd",   # trips
+                "As 2h 3d 4c 5s Jh Kd",   # wheel
+                "2s 3h 4d 5c 6s Jh Kd",   # six high straight
+                "2h 3h 5h 8h 9h Jc Kd",   # flush
+                "2s 2h 2d 8c 8s Jh Kd",   # full house
+                "2s 2h 2d 2c 9s Jh Kd",   # quads
+                "Ah 2h 3h 4h 5h Jc Kd",   # steel wheel
+                "Ah Kh Qh Jh Th 2c 3d",   # royal
+        ]
+        strengths = [HandRankfunc.strength_of_hand(cards(hand)) for hand in ladder]
+        assert strengths == sorted(strengths) and len(set(strengths)) == len(strengths)
+        assert HandRank.from_strength(strengths[0]) == HandRank.HIGH_CARD
+        assert HandRank.from_strength(strengths[-1]) == HandRank.ROYAL_FLUSH
+        # kickers and board plays
+        assert evaluate(cards("As Ah Kd 8c 2s 3h 4d")) > evaluate(cards("As Ah Qd 8c 7s 3h 4d"))
+        assert evaluate(cards("Ts Jh Qd Kc As 2h 3d")) == evaluate(cards("Ts Jh Qd Kc As 4h 5d"))
+        for hand in ladder:
+                assert evaluate_mask(CardMask.from_pile(cards(hand))) == evaluate(cards(hand))
+
+def test_rank_of_hand_is_non_mutating():
+        net = cards("Kd 2s 2h 2d 8c 8s Jh")
+        before = list(net)
+        rank, best = HandRankfunc.rank_of_hand(net)
+        assert rank == HandRank.FULL_HOUSE
+        assert [card.rank for card in best] == [Rank.Two]*3 + [Rank.Eight]*2
+        assert list(net) == before
+
+def test_hand_state_follows_the_streets():
+        import random
+        import pytest
+        from games.poker.evaluator import HandState, evaluate_indices
+        rng = random.Random(2)
+        for _ in range(200):
+                cards = rng.sample(range(52), 7)
+                state = HandState(cards[:2])
+                for n in range(2, 8):
+                        assert state.strength() == evaluate_indices(cards[:n]) and state.count == n
+                        if n < 7:
+                                state.add(cards[n])
+        flush = [0, 1, 2, 3, 4, 20, 30]
+        assert evaluate_indices(iter(flush)) == evaluate_indices(c for c in flush) == evaluate_indices(flush)
+        r = new_round(4)
+        r.open_flop()
+        r.open_turn()
+        for seat, player in enumerate(r.players):
+                assert r.observe(player, seat).strength == evaluate(r.community_cards + player.hand)
+        # read after the river is out the view still rates the turn it was taken on
+        turn = [r.observe(player, seat) for seat, player in enumerate(r.players)]
+        expected = [evaluate(r.community_cards + player.hand) for player in r.players]
+        r.open_river()
+        for observation, strength in zip(turn, expected):
+                assert observation.strength == strength
+                assert observation._asdict()["strength"] == observation.strength
+        with pytest.raises(ValueError):
+                r.players[0].bet_to(int(r.players[0].current_bet) - 1)
+
+def test_evaluate_batch_matches_evaluator():
+        import pytest
+        np = pytest.importorskip("numpy")
+        from games.poker.batch import evaluate_batch, hands_array
+        rng = np.random.default_rng(7)
+        for k in (5, 6, 7):
+                hands = np.argsort(rng.random((2000, 52)), axis=1)[:, :k]
+                strengths, hand_ranks = evaluate_batch(hands)
+                piles = [CardPile([Card.from_index(i) for i in row]) for row in hands.tolist()]
+                assert strengths.tolist() == [evaluate(pile) for pile in piles]
+                assert hand_ranks.tolist() == [HandRank.from_strength(evaluate(pile)) for pile in piles]
+                assert (evaluate_batch(hands_array(piles))[0] == strengths).all()
+
+def new_round(n: int = 3) -> Round:
+        t = Table([Player(chr(ord("A") + i), Chips(1000)) for i in range(n)], blind_amount=Chips(10))
+        return Round(t)
+
+def test_monte_carlo_equity():
+        from games.poker.equity import equity
+        r = new_round(3)
+        r.open_flop()
+        e1 = equity(r, iterations=6000, workers=1, seed=11)
+        e2 = equity(r, iterations=6000, workers=2, seed=11)
+        assert e1 == e2
+        assert abs(sum(e.equity for e in e1.values()) - 1) < 1e-9
+        early = equity(r, iterations=10**6, seed=11, target_ci=0.05)
+        assert all(1.96*e.stderr <= 0.05 for e in early.values())
+        import pytest
+        for bad in ({"iterations": 0}, {"iterations": -3}, {"target_ci": -0.01}):
+                with pytest.raises(ValueError):
+                        equity(r, **bad)
+
+def test_exact_equity_matches_brute_force():
+        from games.poker.equity import exact_equity
+        r = new_round(3)
+        r.open_flop()
+        r.open_turn()
+        exact = exact_equity(r)
+        shares = {player.id: 0.0 for player in r.players}
+        for river in r.deck:
+                board = r.community_cards + river
+                strengths = {player.id: evaluate(board + player.hand) for player in r.players}
+                winners = [id for id, s in strengths.items() if s == max(strengths.values())]
+                for id in winners:
+                        shares[id] += 1/len(winners)/len(r.deck)
+        for id, e in exact.items():
+                assert abs(e.equity - shares[id]) < 1e-9
+
+def test_preflop_table_build_resume_and_lookup(tmp_path):
+        from games.poker.preflop import PreflopTable, build, verify, hand_class, class_name, CLASSES
+        aces = (Card(Suit.SPADES, Rank.Ace), Card(Suit.HEARTS, Rank.Ace))
+        trash = (Card(Suit.SPADES, Rank.Seven), Card(Suit.HEARTS, Rank.Two))
+        assert class_name(hand_class(*aces)) == "AA" and class_name(hand_class(*trash)) == "72o"
+        assert len({hand_class(Card.from_index(a), Card.from_index(b)) for a in range(52) for b in range(a)}) == CLASSES
+        cells = [(hand_class(*aces), 1), (hand_class(*trash), 1), (hand_class(*aces), 3)]
+        path = str(tmp_path / "partial.pfeq")
+        build(path, samples=300, seed=3, cells=cells[:2])
+        table = build(path, samples=300, seed=3, cells=cells[2:])   # resumes the same file
+        fresh = build(str(tmp_path / "fresh.pfeq"), samples=300, seed=3, cells=cells)
+        assert table.to_bytes() == fresh.to_bytes()
+        loaded = PreflopTable.load(path)
+        assert loaded.equity(*aces) > 0.75 > 0.45 > loaded.equity(*trash)
+        assert loaded.equity(*aces, opponents=3) < loaded.equity(*aces)
+        assert verify(path, cells=3) == []
+
+class ShoveAgent():
+        def act(self, observation: Observation) -> Action:
+                return Action(ActionType.RAISE, 10**9)
+
+def test_multiway_all_in_side_pots():
+        players = [Player("A", Chips(100)), Player("B", Chips(300)), Player("C", Chips(500))]
+        t = Table(players, blind_amount=Chips(10))
+        r = Round(t, {p.id: ShoveAgent() for p in players})
+        r.place_blinds()
+        r.betting_round(start=3)
+        assert [int(pot) for pot in r.pots] == [300, 400, 200]
+        assert [pot.seats() for pot in r.ledger.pots([False]*3)] == [[0, 1, 2], [1, 2], [2]]
+        r.open_flop()
+        r.open_turn()
+        r.open_river()
+        won = r.showdown()
+        assert sum(int(chips) for chips in won.values()) == 900
+        assert sum(int(p.stack) for p in players) == 900
+        assert int(won["C"]) >= 200
+
+def test_pot_ledger_side_pots_with_folded_money():
+        ledger = PotLedger(6)
+        for seat, amount in enumerate([50, 200, 120, 200, 30, 80]):
+                ledger.add(seat, amount)
+        folded = [False, False, False, False, True, True]
+        assert ledger.pots(folded) == [Pot(50*4 + 30 + 50, 0b1111), Pot(70*3 + 30, 0b1110), Pot(80*2, 0b1010)]
+        assert sum(pot.amount for pot in ledger.pots(folded)) == ledger.total == 680
+        assert ledger.chips([False]*6)[0] == Chips(180)
+
+def test_settle_ten_way_side_pots():
+        import random
+        from games.poker.settlement import settle, FOLDED
+        rng = random.Random(4)
+        for _ in range(200):
+                ledger = PotLedger(10)
+                for seat in range(10):
+                        ledger.add(seat, rng.choice([7, 25, 40, 40, 101]))
+                folded = [rng.random() < 0.2 for _ in range(10)]
+                folded[rng.randrange(10)] = False
+                strengths = [FOLDED if out else rng.randrange(4) for out in folded]
+                order = list(range(1, 10)) + [0]
+                won = settle(strengths, ledger.pots(folded), order)
+                assert sum(won) == ledger.total
+                expected = [0]*10
+                for pot in ledger.pots(folded):
+                        best = max(strengths[seat] for seat in pot.seats())
+                        winners = [seat for seat in order if pot.eligible >> seat & 1 and strengths[seat] == best]
+                        for i, seat in enumerate(winners):
+                                expected[seat] += pot.amount // len(winners) + (i < pot.amount % len(winners))
+                assert won == expected
+
+def test_simulator_conserves_chips():
+        import random
+        players = [Player(c, Chips(10000)) for c in "ABCDEF"]
+        for p in players:
+                p.auto_buyin_atmax = True
+        t = Table(players, blind_amount=Chips(10))
+        sim = Simulator(t, {p.id: RandomAgent(random.Random(i)) for i, p in enumerate(players)})
+        total = sum(sim.chips().values())
+        results = sim.play(300)
+        assert sim.hands_played == 300 == t.round_count
+        assert sum(results.values()) == 0 and sum(sim.chips().values()) == total
+
+def random_table(table_id: int):
+        players = [Player(f"P{i}", Chips(100000)) for i in range(2 + table_id % 5)]
+        for p in players:
+                p.auto_buyin_atmax = True
+        return Table(players, blind_amount=Chips(10)), {p.id: RandomAgent() for p in players}
+
+def test_run_tables_is_deterministic_and_replayable():
+        from games.poker.runner import run_tables, replay_hand
+        def totals(reports):
+                resp = {}
+                for report in reports:
+                        for id, delta in report.deltas.items():
+                                resp[(report.table_id, id)] = resp.get((report.table_id, id), 0) + delta
+                return resp
+        serial = list(run_tables(random_table, tables=3, hands=40, seed=9, workers=1, report_every=15))
+        parallel = list(run_tables(random_table, tables=3, hands=40, seed=9, workers=2, report_every=15))
+        assert len(serial) == len(parallel) == 3*3
+        assert totals(serial) == totals(parallel)
+        assert sum(r.hands for r in parallel if r.table_id == 1) == 40
+        first, again = replay_hand(random_table, 9, 2, 17), replay_hand(random_table, 9, 2, 17)
+        assert [c.index for c in first.community_cards] == [c.index for c in again.community_cards]
+        assert [c.index for c in first.deck] == [c.index for c in again.deck]
+
+def test_hand_history_round_trip_and_replay(tmp_path):
+        from games.poker.history import HistoryWriter, read_history, replay, record_of
+        table, agents = random_table(4)
+        path = str(tmp_path / "hands.phh")
+        with HistoryWriter(path) as history:
+                Simulator(table, agents, seed=5, history=history).play(50)
+        records = list(read_history(path))
+        assert len(records) == 50 and records[0].round_id == 1
+        for record in records:
+                assert replay(record) and record_of(replay(record)) == record
+        record = max(records, key=lambda r: len(r.actions))
+        halfway = replay(record, len(record.actions) // 2)
+        assert halfway.actions == [tuple(action) for action in record.actions[:len(record.actions) // 2]]
+
+def test_range_parser():
+        import pytest
+        from games.poker.ranges import parse_range, combos
+        assert len(parse_range("QQ+")) == 18 and len(parse_range("QQ-88")) == 30
+        assert len(parse_range("AKs, A5s-A2s, KQo")) == 4 + 16 + 12
+        assert len(parse_range("ATs+")) == 16 and len(parse_range("AK")) == 16 and len(parse_range("AsKh")) == 1
+        assert parse_range("KK, KhKd:0.25")[(Card(Suit.DIAMONDS, Rank.King).index, Card(Suit.HEARTS, Rank.King).index)] == 0.25
+        assert len(combos("AA, AKs", cards("As 7d 2c"))) == 3 + 3
+        with pytest.raises(ValueError):
+                parse_range("AKx")
+
+def test_range_equity_matrix():
+        import pytest
+        np = pytest.importorskip("numpy")
+        from games.poker.ranges import range_equity
+        result = range_equity("AA", "KK, AKs", samples=3000, seed=1)
+        assert result.matrix.shape == (6, 10) and np.isnan(result.matrix).sum() == 6*4 - 12
+        assert 0.78 < np.nanmean(result.matrix[:, :6]) < 0.86
+        assert range_equity("AA", "KK, AKs", samples=3000, seed=1).matrix is result.matrix
+        board = cards("2c 7d 9h Js 3s")
+        river = range_equity("AcAd", "KcKd, 7c7s", board)
+        assert river.matrix.tolist() == [[0.0, 1.0]] and river.equity() == 0.5 # 7c7s sorts first
+        turn = range_equity("QQ", "JJ", cards("2c 7d 9h Js"))
+        assert turn.matrix.shape == (6, 3) and np.allclose(turn.matrix, 2/44)
+
+def test_benchmark_suite_and_regression_check():
+        from benchmarks.suite import run, compare
+        results = run(["deck52", "rank_hands"], iterations=20, memory_iterations=2)
+        assert set(results) == {"deck52", "rank_hands"}
+        assert all(r["ops_per_sec"] > 0 and r["p99_us"] >= r["p50_us"] for r in results.values())
+        slower = {name: dict(r, ops_per_sec=r["ops_per_sec"] / 2) for name, r in results.items()}
+        assert compare(slower, results, 0.1) and not compare(results, slower, 0.1)
+
+def test_profiling_hooks_are_opt_in():
+        import json
+        from games.poker.profiling import Profiler
+        play = Round.play
+        table, agents = random_table(4)
+        with Profiler() as profiler:
+                assert Round.play is not play
+                Simulator(table, agents, seed=3).play(20)
+                HandRankfunc.rank_of_hand(cards("As Ks Qs Js Ts 2d 3c"))
+        assert Round.play is play
+        snapshot = json.loads(profiler.to_json())
+        assert snapshot["phases"]["round.hand"]["count"] == 20 == snapshot["counters"]["round.init"]
+        assert snapshot["counters"]["pile.deal_round_robin"] == 20 # the hole cards of a round in one step
+        assert snapshot["phases"]["handrank.rank_of_hand"]["count"] == 1
+        phase = snapshot["phases"]["round.betting"]
+        assert sum(phase["buckets"].values()) == phase["count"] and phase["p50_ns"] <= phase["p99_ns"]
+        outer, inner = Profiler(), Profiler()
+        with outer:
+                with inner:
+                        HandRankfunc.rank_of_hand(cards("As Ks Qs Js Ts 2d 3c"))
+                assert Round.play is not play and outer.enabled and not inner.enabled
+                HandRankfunc.rank_of_hand(cards("As Ks Qs Js Ts 2d 3c"))
+        assert Round.play is play
+        assert outer.counters["handrank.rank_of_hand"] == 2 and inner.counters["handrank.rank_of_hand"] == 1
+
+def test_census_matches_brute_force_on_small_prefixes():
+        from itertools import combinations
+        from games.poker.census import census, prefixes, table_candidate
+        from games.poker.evaluator import evaluate_indices
+        result = census(workers=1, candidate=table_candidate, fraction=0.5, limit=100)
+        expected = {rank: 0 for rank in HandRank}
+        for c0, c1 in prefixes()[-100:]:
+                for rest in combinations(range(c1 + 1, 52), 5):
+                        expected[HandRank.from_strength(evaluate_indices((c0, c1) + rest))] += 1
+        assert result.counts == expected and result.hands == sum(expected.values())
+        assert 0 < result.checked < result.hands and result.mismatches == []
+        wrong = census(workers=1, candidate=lambda cards: HandRank.HIGH_CARD, fraction=1.0, limit=20, max_mismatches=5)
+        assert len(wrong.mismatches) == 5
+
+def test_async_server_with_load_client():
+        import asyncio
+        from games.poker.loadtest import local_load
+        report, server = asyncio.run(local_load(tables=30, hands=5, seats=3, connections=4, seed=2))
+        assert report.hands == 30*5 and report.errors == 0 and report.actions > 0
+        for runtime in server.tables.values():
+                assert runtime.hands >= 5
+                assert sum(int(p.stack) + int(p.bankroll) for p in runtime.table.players) == 6*10**9
+
+class _RuleAgent():
+        "deterministic, so a copied round can be played on with the same decisions"
+        def act(self, observation):
+                if observation.to_call > 40 and observation.strength < 2 << 20:
+                        return Action(ActionType.FOLD)
+                if observation.strength >= 2 << 20 and observation.current_bet < 100:
+                        return Action(ActionType.RAISE, observation.min_raise)
+                return Action(ActionType.CALL)
+
+def test_snapshot_restore_and_clone_play_on_identically():
+        import random
+        import pytest
+        from games.poker.snapshot import snapshot, restore, snapshot_table, restore_table
+        def state(round):
+                return (round.won, round.actions, [c.index for c in round.community_cards],
+                        [(p.id, int(p.stack), int(p.bankroll)) for p in round.table.players], round.table.round_count)
+        agent = _RuleAgent()
+        checked = 0
+        for decisions in range(12):
+                players = [Player(f"P{i}", Chips(5000)) for i in range(4)]
+                table = Table(players, blind_amount=Chips(10))
+                round = Round(table, {p.id: agent for p in players}, random.Random(decisions))
+                steps = round.play_steps()
+                try:
+                        seat, observation = next(steps)
+                        for _ in range(decisions):
+                                seat, observation = steps.send(agent.act(observation))
+                except StopIteration:
+                        continue
+                data = snapshot(round)
+                copy, restored = round.clone(), restore(data, round.agents)
+                assert snapshot(restored) == snapshot(copy) == data and len(data) < 512
+                try:
+                        while True:
+                                seat, observation = steps.send(agent.act(observation))
+                except StopIteration:
+                        pass
+                assert copy.table.round_count == restored.table.round_count == 0
+                copy.play(), restored.play()
+                assert state(copy) == state(restored) == state(round)
+                checked += 1
+        assert checked > 4
+        assert snapshot_table(restore_table(snapshot_table(table))) == snapshot_table(table)
+        with pytest.raises(ValueError):
+                restore(data[:3] + bytes([99]) + data[4:])
+        with pytest.raises(ValueError):
+                restore(snapshot_table(table))
+
+def test_push_fold_equilibrium(tmp_path):
+        import random
+        import pytest
+        pytest.importorskip("numpy")
+        from games.poker.pushfold import hand_matrix, load_matrix, solve, table_chart, combo_count, PushFoldAgent
+        matrix = hand_matrix(samples=60)
+        assert matrix.weights.sum() == 1326*1225
+        path = str(tmp_path / "matrix.bin")
+        saved = hand_matrix(samples=60, path=path)
+        assert (load_matrix(path).equity == saved.equity).all() and (saved.equity == matrix.equity).all()
+        assert (hand_matrix(samples=60, seed=0, path=path).equity == saved.equity).all() # loaded
+        with pytest.raises(ValueError):
+                hand_matrix(samples=61, path=path)
+        aces, kings, seven_deuce = 168, 154, 5*13 + 0
+        charts = [solve(depth, matrix=matrix) for depth in (2, 8, 20)]
+        pushed = [sum(p*combo_count(i) for i, p in enumerate(c.push))/1326 for c in charts]
+        assert pushed[0] > pushed[1] > pushed[2] > 0.25
+        for c in charts:
+                assert c.exploitability < 1e-3 and c.push[aces] == c.call[aces] == 1
+        assert charts[2].push[seven_deuce] < 0.01 and charts[0].call[kings] == 1
+        assert solve(8, ante=0.125, matrix=matrix).push[seven_deuce] >= charts[1].push[seven_deuce]
+        players = [Player("SB", Chips(10000)), Player("BB", Chips(10000))]
+        for p in players:
+                p.auto_buyin_atmax = True
+        table = Table(players, blind_amount=Chips(10), min_buyin=Chips(200))
+        assert table_chart(table, samples=60) is table_chart(table, samples=60)
+        agents = {p.id: PushFoldAgent(table, rng=random.Random(i), samples=60) for i, p in enumerate(players)}
+        for _ in range(20):
+                Round(table, agents).play()
+        assert sum(int(p.stack) + int(p.bankroll) for p in players) == 20000
+
+def test_suit_isomorphism_index():
+        import random
+        from itertools import combinations
+        from games.poker.isomorphism import STREETS, ORDERED, index, unindex, canonical
+        assert [indexer.size() for indexer in STREETS] == [169, 1_286_792, 13_960_050, 123_156_254]
+        assert ORDERED.size(1) == STREETS[1].size() and ORDERED.size() > STREETS[3].size()
+        assert sorted({STREETS[0].index_of(hole) for hole in combinations(range(52), 2)}) == list(range(169))
+        rng = random.Random(4)
+        for indexer in STREETS + [ORDERED]:
+                for _ in range(300):
+                        cards = rng.sample(range(52), sum(indexer.rounds))
+                        i = indexer.index_of(cards)
+                        suits = rng.sample(range(4), 4)
+                        renamed = [13*suits[c // 13] + c % 13 for c in cards]
+                        assert indexer.index_of(renamed[1::-1] + renamed[2:]) == i
+                        assert indexer.index_of(indexer.unindex_of(i)) == i
+                        j = rng.randrange(indexer.size())
+                        assert indexer.index_of(indexer.unindex_of(j)) == j
+        hole, board = [Card.from_index(0), Card.from_index(13)], CardPile([Card.from_index(c) for c in (26, 1, 40)])
+        other = [Card.from_index(39), Card.from_index(26)], [Card.from_index(c) for c in (0, 40, 14)]
+        assert index(hole, board) == index(*other) and canonical(hole, board) == canonical(*other)
+        assert unindex(index(hole, board), 1) == canonical(hole, board)
+
+def test_eval_cache_is_bounded_order_independent_and_thread_safe():
+        import random
+        from concurrent.futures import ThreadPoolExecutor
+        from games.poker.evalcache import EvalCache
+        rng = random.Random(6)
+        hands = [rng.sample(range(52), 7) for _ in range(50)]
+        cache = EvalCache(maxsize=32)
+        for hand in hands:
+                pile = CardPile([Card.from_index(c) for c in hand])
+                before = [card.index for card in pile]
+                (rank, five), (expected, cards) = HandRankfunc.cached_rank_of_hand(pile, cache), HandRankfunc.rank_of_hand(pile)
+                # equal ranks may come from other suits, the card set has no order to break the tie
+                assert rank == expected and [card.rank for card in five] == [card.rank for card in cards]
+                assert [card.index for card in pile] == before
+                assert cache.strength(reversed(pile)) == HandRankfunc.strength_of_hand(pile)
+        stats = cache.stats()
+        assert (stats.hits, stats.misses, stats.evictions, stats.size) == (50, 50, 18, 32)
+        def work(seed):
+                local = random.Random(seed)
+                for _ in range(2000):
+                        cache.strength(CardMask.from_indices(local.choice(hands)))
+        with ThreadPoolExecutor(8) as pool:
+                list(pool.map(work, range(8)))
+        stats = cache.stats()
+        assert stats.hits + stats.misses == 100 + 8*2000 and stats.size == 32
+        assert stats.misses - stats.evictions >= 32 # a set missed by two threads at once is stored twice
+
+def test_server_rejects_bad_actions_without_blocking_the_reader():
+        import asyncio
+        import pytest
+        from games.poker.server import GameServer
+        class Client():
+                def __init__(self):
+                        self.actions, self.sent = {}, []
+                async def send(self, message):
+                        self.sent.append(message)
+                        return True
+        async def scenario():
+                server, client = GameServer(1, action_timeout=5.0), Client()
+                await server.dispatch(client, {"op": "sit", "table": 0, "player": "S0"})
+                for bad in ({"type": "raise", "amount": None}, {"type": "raise", "amount": -5}, {"type": "shove"}):
+                        with pytest.raises(ValueError):
+                                await server.dispatch(client, {"op": "action", "table": 0, "player": "S0", "seq": 1, **bad})
+                for seq in range(3): # answers nobody asked for replace each other instead of blocking
+                        await asyncio.wait_for(server.dispatch(client, {"op": "action", "table": 0, "player": "S0",
+                                                                        "seq": seq, "type": "call"}), 1.0)
+                queue = client.actions[0, "S0"]
+                assert queue.qsize() == 1 and queue.get_nowait()["seq"] == 2
+                queue.put_nowait({"seq": 9})
+                server.leave(0, "S0", client)
+                assert queue.get_nowait() is None and queue.empty()
+                await server.close(grace=0)
+        asyncio.run(scenario())